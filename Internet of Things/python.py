@@ -2,9 +2,15 @@ import firebase_admin
 from firebase_admin import credentials
 from firebase_admin import db
 import paho.mqtt.client as mqtt
-import json
+import os
+import sys
 import time
 
+# Decoder payload (JSON / biner) dipakai bersama dengan bridge_ml.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Machine_Learning", "scripts"))
+from sensor_codec import decode_payload
+from compression import SeriesCompressor
+
 # --- 1. SETUP FIREBASE ---
 # Pastikan nama file JSON sesuai dengan yang ada di folder laptopmu
 cred = credentials.Certificate("komposproject-dfe5e-firebase-adminsdk-fbsvc-07b42ceab7.json")
@@ -17,6 +23,10 @@ ref_history = db.reference('sensor_logs')
 # Reference untuk Status Terkini (Angka Realtime)
 ref_current = db.reference('sensor_now')
 
+# Kompresi swinging door: History hanya menyimpan titik yang dibutuhkan
+# untuk merekonstruksi grafik dalam toleransi (lihat compression.py)
+kompresor = SeriesCompressor()
+
 # --- 2. KONFIGURASI MQTT ---
 MQTT_BROKER = "broker.hivemq.com"
 MQTT_PORT = 1883
@@ -31,25 +41,24 @@ def on_connect(client, userdata, flags, rc, properties=None):
 
 def on_message(client, userdata, msg):
     try:
-        # 1. Terima payload
-        payload = msg.payload.decode("utf-8")
-        print(f"\n[MQTT] Terima Data: {payload}")
-        
-        # 2. Parsing JSON
-        data_json = json.loads(payload)
-        
-        # 3. Tambahkan timestamp
-        # Menggunakan timestamp miliseconds agar lebih presisi
-        data_json['timestamp'] = int(time.time() * 1000) 
-        
-        # 4. KIRIM KE FIREBASE (DUA METODE)
-        
-        # A. Simpan ke History (Grafik) - Menggunakan .push()
-        ref_history.push(data_json)
+        # 1 & 2. Terima payload dan parsing (JSON atau biner v1, bisa berisi beberapa pembacaan)
+        readings = decode_payload(msg.payload)
+        print(f"\n[MQTT] Terima Data: {readings}")
         
-        # B. Simpan ke Current Status (Realtime) - Menggunakan .set()
-        # Ini akan menimpa data lama, jadi yang ada disitu selalu data terbaru
-        ref_current.set(data_json)
+        for data_json in readings:
+            # 3. Tambahkan timestamp (kecuali sudah dikirim device)
+            # Menggunakan timestamp miliseconds agar lebih presisi
+            data_json.setdefault('timestamp', int(time.time() * 1000))
+            
+            # 4. KIRIM KE FIREBASE (DUA METODE)
+            
+            # A. Simpan ke History (Grafik) - Menggunakan .push(), hanya titik hasil kompresi
+            for record in kompresor.tambah(str(data_json.get('device_id', 'default')), data_json):
+                ref_history.push(record)
+            
+            # B. Simpan ke Current Status (Realtime) - Menggunakan .set()
+            # Ini akan menimpa data lama, jadi yang ada disitu selalu data terbaru
+            ref_current.set(data_json)
         
         print("✅ [Firebase] Data tersimpan di History & Update Realtime!")
         
@@ -76,4 +85,7 @@ if __name__ == "__main__":
     try:
         client.loop_forever()
     except KeyboardInterrupt:
+        # Simpan titik terakhir tiap device yang masih tertahan kompresi
+        for record in kompresor.flush_semua():
+            ref_history.push(record)
         print("\nProgram dihentikan.")
@@ -1,191 +1,124 @@
 from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-import cv2
-import mediapipe as mp
-import time
+import json
+import os
+import queue
+
+from kiosk import KioskRegistry, parse_sources
 
 app = Flask(__name__)
 # Mengizinkan akses dari React (biasanya di localhost:3000 atau localhost:5173)
 CORS(app)
 
-# --- Setup MediaPipe ---
-mp_hands = mp.solutions.hands
-hands = mp_hands.Hands(min_detection_confidence=0.7, min_tracking_confidence=0.5)
-mp_draw = mp.solutions.drawing_utils
-
-# --- Variabel Global ---
-camera = cv2.VideoCapture(0)
-
-# Data User Sementara
-user_data = {"name": "", "nim": ""}
-current_item = ""
-
-# Status Aplikasi
-app_mode = "idle" 
-process_status = None 
-
-# Variabel Timer
-state_start_time = None
-current_gesture_state = None 
-REQUIRED_HOLD_TIME = 2.0 
-
-def count_fingers(hand_landmarks):
-    tip_ids = [4, 8, 12, 16, 20]
-    fingers = []
-    
-    # Jempol (Logika untuk tangan kanan, bisa dibalik jika perlu)
-    if hand_landmarks.landmark[tip_ids[0]].x < hand_landmarks.landmark[tip_ids[0] - 1].x:
-        fingers.append(1)
-    else:
-        fingers.append(0)
-    
-    # 4 Jari Lainnya
-    for id in range(1, 5):
-        if hand_landmarks.landmark[tip_ids[id]].y < hand_landmarks.landmark[tip_ids[id] - 2].y:
-            fingers.append(1)
-        else:
-            fingers.append(0)
-    
-    return fingers.count(1)
-
-def generate_frames():
-    global app_mode, process_status, state_start_time, current_gesture_state
-    
-    while True:
-        success, frame = camera.read()
-        if not success:
-            break
-        
-        frame = cv2.flip(frame, 1)
-        img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = hands.process(img_rgb)
-        
-        # --- LOGIKA UTAMA ---
-        if app_mode != "idle" and process_status is None:
-            
-            # Header Text di Video
-            header_text = "MODE: REGISTRASI" if app_mode == 'register_scan' else "MODE: PEMBAYARAN"
-            cv2.putText(frame, header_text, (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 0), 2)
-            
-            if results.multi_hand_landmarks:
-                for hand_landmarks in results.multi_hand_landmarks:
-                    mp_draw.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
-                    total_fingers = count_fingers(hand_landmarks)
-                    
-                    target_state = None
-                    color = (255, 255, 255)
-                    msg = ""
-
-                    # --- MODE REGISTRASI ---
-                    if app_mode == 'register_scan':
-                        if total_fingers == 5:
-                            target_state = 'validating_reg'
-                            msg = "TAHAN 5 JARI..."
-                            color = (0, 255, 0)
-                        else:
-                            msg = "Tunjukkan 5 Jari"
-                            color = (0, 255, 255)
-
-                    # --- MODE PEMBAYARAN ---
-                    elif app_mode == 'payment_scan':
-                        if total_fingers == 5:
-                            target_state = 'validating_pay_success'
-                            msg = "VERIFIKASI..."
-                            color = (0, 255, 0)
-                        elif total_fingers == 3 or total_fingers == 4:
-                            target_state = 'validating_pay_fail'
-                            msg = "CEK DATABASE..."
-                            color = (0, 0, 255) 
-                        else:
-                            msg = "Scan Jari Anda"
-                            color = (0, 255, 255)
-
-                    # --- TIMER PROSES ---
-                    if target_state:
-                        if current_gesture_state != target_state:
-                            current_gesture_state = target_state
-                            state_start_time = time.time()
-                        
-                        elapsed = time.time() - state_start_time
-                        
-                        # Loading Bar Visual
-                        bar_width = int(300 * (elapsed/REQUIRED_HOLD_TIME))
-                        cv2.rectangle(frame, (50, 60), (50 + bar_width, 80), color, -1)
-                        cv2.rectangle(frame, (50, 60), (350, 80), (255, 255, 255), 2)
-                        cv2.putText(frame, msg, (50, 110), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
-
-                        if elapsed >= REQUIRED_HOLD_TIME:
-                            if target_state == 'validating_reg':
-                                process_status = 'reg_success'
-                            elif target_state == 'validating_pay_success':
-                                process_status = 'pay_success'
-                            elif target_state == 'validating_pay_fail':
-                                process_status = 'pay_failed'
-                    else:
-                        current_gesture_state = None
-                        state_start_time = None
-                        cv2.putText(frame, msg, (20, 400), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-            else:
-                current_gesture_state = None
-                cv2.putText(frame, "Arahkan Tangan...", (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-        
-        # --- FEEDBACK HASIL AKHIR ---
-        if process_status == 'reg_success':
-            cv2.putText(frame, "TERDAFTAR!", (150, 240), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 255, 0), 4)
-        elif process_status == 'pay_success':
-            cv2.putText(frame, "LUNAS!", (200, 240), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 255, 0), 4)
-        elif process_status == 'pay_failed':
-            cv2.putText(frame, "GAGAL!", (200, 240), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 255), 4)
-
-        ret, buffer = cv2.imencode('.jpg', frame)
-        frame = buffer.tobytes()
-        yield (b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+# --- Daftar Kiosk ---
+# Satu proses bisa melayani beberapa kamera/kasir, contoh:
+#   KIOSK_SOURCES="kasir1=0,kasir2=1" python app.py
+# Tanpa konfigurasi: satu kiosk "default" memakai webcam 0 (perilaku lama).
+DEFAULT_KIOSK = "default"
+kiosks = KioskRegistry(parse_sources(os.environ.get("KIOSK_SOURCES", f"{DEFAULT_KIOSK}=0")))
+
+KEEPALIVE_INTERVAL = 15.0 # Komentar SSE kosong agar koneksi tidak diputus proxy
+
+def get_session():
+    """
+    Kiosk dipilih lewat query string (?kiosk=kasir1) atau field JSON "kiosk".
+    Return (session, None) atau (None, response_error).
+    """
+    data = request.get_json(silent=True) or {}
+    kiosk_id = request.args.get('kiosk') or data.get('kiosk') or DEFAULT_KIOSK
+    session = kiosks.get(kiosk_id)
+    if session is None:
+        return None, (jsonify({"message": f"Kiosk '{kiosk_id}' tidak terdaftar", "status": "error"}), 404)
+    return session, None
 
 # Rute halaman utama agar tidak 404 saat dibuka di browser
 @app.route('/')
 def index():
     return "Backend Flask Aktif! Silakan buka Frontend React (biasanya http://localhost:5173) untuk menggunakan aplikasi."
 
+@app.route('/kiosks')
+def list_kiosks():
+    return jsonify({"kiosks": list(kiosks.sources.keys())})
+
 @app.route('/video_feed')
 def video_feed():
-    return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    session, error = get_session()
+    if error:
+        return error
+    return Response(session.generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/submit_registration', methods=['POST'])
 def submit_registration():
-    global user_data, app_mode, process_status, state_start_time
+    session, error = get_session()
+    if error:
+        return error
     data = request.json
-    user_data['name'] = data.get('name')
-    user_data['nim'] = data.get('nim')
-    app_mode = 'register_scan'
-    process_status = None
-    state_start_time = None
+    session.start_registration(data.get('name'), data.get('nim'))
     return jsonify({"message": "Registration started", "status": "ok"})
 
 @app.route('/start_payment', methods=['POST'])
 def start_payment():
-    global current_item, app_mode, process_status, state_start_time
+    session, error = get_session()
+    if error:
+        return error
     data = request.json
-    current_item = data.get('item')
-    app_mode = 'payment_scan'
-    process_status = None
-    state_start_time = None
+    session.start_payment(data.get('item'))
     return jsonify({"message": "Payment started", "status": "ok"})
 
 @app.route('/reset_app', methods=['POST'])
 def reset_app():
-    global app_mode, process_status
-    app_mode = "idle"
-    process_status = None
+    session, error = get_session()
+    if error:
+        return error
+    session.reset()
     return jsonify({"message": "Reset done"})
 
 @app.route('/check_status')
 def check_status():
-    global process_status
-    if process_status:
-        # Kembalikan status dan reset status internal agar tidak loop
-        current_status = process_status
-        return jsonify({"status": current_status, "user": user_data})
+    session, error = get_session()
+    if error:
+        return error
+    snapshot = session.snapshot()
+    if snapshot["status"] != "waiting":
+        return jsonify({"status": snapshot["status"], "user": snapshot["user"]})
     return jsonify({"status": "waiting"})
 
+@app.route('/status_stream')
+def status_stream():
+    """
+    Pengganti polling /check_status: Server-Sent Events.
+    Event: 'status' (snapshot awal), 'mode' (start/reset), 'progress' (lama tahan gesture),
+    'result' (reg_success / pay_success / pay_failed).
+    Frontend cukup: new EventSource('http://localhost:5000/status_stream?kiosk=default')
+    """
+    session, error = get_session()
+    if error:
+        return error
+    q = session.subscribe()
+
+    def format_sse(event, data):
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    def stream():
+        try:
+            yield format_sse("status", session.snapshot())
+            while True:
+                try:
+                    item = q.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    # Client terlalu lambat (event penting terlewat) -> tutup, client reconnect
+                    return
+                yield format_sse(*item)
+        finally:
+            # Client menutup koneksi -> lepas antriannya
+            session.unsubscribe(q)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream(), mimetype='text/event-stream', headers=headers)
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # threaded=True: tiap kiosk (video + client SSE) berjalan di thread sendiri
+    app.run(debug=True, port=5000, threaded=True)
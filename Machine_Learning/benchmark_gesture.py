@@ -0,0 +1,166 @@
+"""
+Benchmark offline pipeline gesture (tanpa webcam).
+
+Contoh:
+    python benchmark_gesture.py rekaman/bayar_5jari.mp4 --mode payment
+    python benchmark_gesture.py "frames/*.jpg" --mode register --clock video --json hasil.json
+
+Laporan:
+- waktu per tahap: capture, flip_convert, hands (hands.process), draw, encode (JPEG)
+- FPS end-to-end
+- waktu sampai konfirmasi gesture (reg_success / pay_success / pay_failed), dihitung dari
+  gesture target pertama terdeteksi dan (terpisah) dari mode dimulai.
+  Setelah konfirmasi, mode dijalankan ulang sehingga satu video bisa berisi beberapa gesture.
+
+--clock video memakai waktu video (index frame / fps) untuk timer tahan gesture,
+sehingga hasil konfirmasi sama di mesin cepat maupun lambat (cocok untuk CI).
+"""
+import argparse
+import json
+import time
+
+import cv2
+
+from kiosk import KioskSession, open_frame_source
+
+STAGES = ['capture', 'flip_convert', 'hands', 'draw', 'encode']
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+def ringkas(values):
+    """Statistik dalam milidetik"""
+    if not values:
+        return {"mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    return {
+        "mean_ms": round(1000 * sum(values) / len(values), 3),
+        "p50_ms": round(1000 * percentile(values, 50), 3),
+        "p95_ms": round(1000 * percentile(values, 95), 3),
+        "max_ms": round(1000 * max(values), 3),
+    }
+
+def run_benchmark(source, mode='payment', clock_mode='wall', max_frames=None, warmup=5):
+    camera = open_frame_source(source)
+    if not camera.isOpened():
+        raise RuntimeError(f"Sumber frame '{source}' tidak bisa dibuka")
+
+    fps = camera.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_index = 0
+    if clock_mode == 'video':
+        clock = lambda: frame_index / fps
+    else:
+        clock = time.time
+
+    session = KioskSession('benchmark', source, clock=clock)
+    session.camera = camera
+    session.open()
+
+    def mulai_mode():
+        if mode == 'register':
+            session.start_registration("benchmark", "0")
+        else:
+            session.start_payment("benchmark")
+        return clock(), frame_index
+
+    stage_times = {stage: [] for stage in STAGES}
+    confirmations = []
+    mode_start, mode_start_frame = mulai_mode()
+    hold_state, hold_start_frame = None, None
+    total_start = None
+
+    while max_frames is None or frame_index < max_frames:
+        t0 = time.perf_counter()
+        success, frame = camera.read()
+        t1 = time.perf_counter()
+        if not success:
+            break
+
+        timings = {}
+        frame = session.process_frame(frame, timings)
+        t2 = time.perf_counter()
+        ret, buffer = cv2.imencode('.jpg', frame)
+        t3 = time.perf_counter()
+
+        frame_index += 1
+        # Frame saat gesture yang sedang ditahan mulai (timer REQUIRED_HOLD_TIME)
+        if session.current_gesture_state != hold_state:
+            hold_state, hold_start_frame = session.current_gesture_state, frame_index
+
+        # Frame awal dilewati dari statistik (inisialisasi graph MediaPipe)
+        if frame_index > warmup:
+            if total_start is None:
+                total_start = t0
+            stage_times['capture'].append(t1 - t0)
+            for stage, value in timings.items():
+                stage_times[stage].append(value)
+            stage_times['encode'].append(t3 - t2)
+
+        status = session.process_status
+        if status:
+            now = clock()
+            confirmations.append({
+                "status": status,
+                "frame": frame_index,
+                # Dari gesture target pertama kali terdeteksi (tidak termasuk jeda sebelum tangan muncul)
+                "time_to_confirm_s": round(now - session.state_start_time, 3),
+                "frames_to_confirm": frame_index - hold_start_frame + 1,
+                # Dari mode dimulai
+                "time_from_mode_start_s": round(now - mode_start, 3),
+                "frames_from_mode_start": frame_index - mode_start_frame,
+            })
+            mode_start, mode_start_frame = mulai_mode()
+            hold_state, hold_start_frame = None, None
+
+    total_end = time.perf_counter()
+    camera.release()
+
+    measured = len(stage_times['capture'])
+    elapsed = (total_end - total_start) if total_start is not None else 0.0
+    return {
+        "source": str(source),
+        "mode": mode,
+        "clock": clock_mode,
+        "frames": frame_index,
+        "measured_frames": measured,
+        "end_to_end_fps": round(measured / elapsed, 2) if elapsed > 0 else 0.0,
+        "stages": {stage: ringkas(values) for stage, values in stage_times.items()},
+        "confirmations": confirmations,
+    }
+
+def cetak_laporan(report):
+    print(f"\n📊 Benchmark: {report['source']} (mode={report['mode']}, clock={report['clock']})")
+    print(f"   Frame      : {report['frames']} (diukur {report['measured_frames']})")
+    print(f"   FPS E2E    : {report['end_to_end_fps']}")
+    print(f"   {'tahap':<14}{'mean':>10}{'p50':>10}{'p95':>10}{'max':>10}  (ms)")
+    for stage in STAGES:
+        s = report['stages'][stage]
+        print(f"   {stage:<14}{s['mean_ms']:>10.2f}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['max_ms']:>10.2f}")
+
+    if not report['confirmations']:
+        print("   ⚠️ Tidak ada gesture yang terkonfirmasi.")
+    for c in report['confirmations']:
+        print(f"   ✅ {c['status']:<12} frame {c['frame']:>5}  "
+              f"tahan {c['time_to_confirm_s']:.2f} s ({c['frames_to_confirm']} frame), "
+              f"sejak mode mulai {c['time_from_mode_start_s']:.2f} s ({c['frames_from_mode_start']} frame)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark offline pipeline gesture dari rekaman video / gambar.")
+    parser.add_argument('source', help="File video, folder gambar, atau pola glob (contoh: 'frames/*.jpg')")
+    parser.add_argument('--mode', choices=['register', 'payment'], default='payment')
+    parser.add_argument('--clock', choices=['wall', 'video'], default='wall',
+                        help="wall = waktu nyata, video = waktu berdasarkan fps rekaman")
+    parser.add_argument('--max-frames', type=int, default=None)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--json', dest='json_path', default=None, help="Simpan laporan ke file JSON")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.source, args.mode, args.clock, args.max_frames, args.warmup)
+    cetak_laporan(report)
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Laporan disimpan ke {args.json_path}")
@@ -15,6 +15,22 @@ const char* mqtt_topic  = "talha/sensor";
 WiFiClient espClient;
 PubSubClient client(espClient);
 
+// Format payload: 0 = JSON (default), 1 = biner v1 (lihat scripts/sensor_codec.py)
+#define USE_BINARY_PAYLOAD 0
+
+// Layout biner v1 (little-endian, tanpa padding) -> 26 byte per pesan
+struct __attribute__((packed)) SensorPacket {
+  char magic[2];       // 'K', 'P'
+  uint8_t version;     // 1
+  uint8_t flags;       // 0
+  uint16_t count;      // jumlah record (1)
+  uint32_t device_id;  // byte MAC ke-3..6 (termasuk 3 byte NIC yang unik per board)
+  uint32_t timestamp;  // 0 = pakai waktu bridge
+  float suhu;
+  float moisture;
+  float ph;
+};
+
 // ==========================================
 // 2. PIN SENSOR (SEMUA POTENSIO)
 // ==========================================
@@ -153,6 +169,11 @@ void loop() {
     lcd.setCursor(0,1);
     lcd.printf("pH:%.1f R:%d", ph, relay1State ? 1 : 2);
 
+#if USE_BINARY_PAYLOAD
+    // --- KIRIM BINER v1 ---
+    SensorPacket pkt = {{'K', 'P'}, 1, 0, 1, (uint32_t)(ESP.getEfuseMac() >> 16), 0, (float)suhu, (float)moisture, ph};
+    client.publish(mqtt_topic, (const uint8_t*)&pkt, sizeof(pkt));
+#else
     // --- KIRIM JSON (Tanpa pemrosesan rumit) ---
     // Format: {"suhu": 32, "moisture": 60, "ph": 7.5}
     String payload = "{";
@@ -162,5 +183,6 @@ void loop() {
     payload += "}";
 
     client.publish(mqtt_topic, payload.c_str());
+#endif
   }
 }
\ No newline at end of file
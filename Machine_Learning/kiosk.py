@@ -0,0 +1,396 @@
+import cv2
+import mediapipe as mp
+import glob
+import os
+import time
+import queue
+import threading
+
+# --- Setup MediaPipe ---
+mp_hands = mp.solutions.hands
+mp_draw = mp.solutions.drawing_utils
+
+REQUIRED_HOLD_TIME = 2.0
+
+# --- Push Status (Server-Sent Events) ---
+SUBSCRIBER_QUEUE_SIZE = 100
+PROGRESS_INTERVAL = 0.1   # Batas kirim event progress (detik), agar tidak banjir tiap frame
+
+# Hasil akhir dari tiap target gesture
+FINAL_STATUS = {
+    'validating_reg': 'reg_success',
+    'validating_pay_success': 'pay_success',
+    'validating_pay_fail': 'pay_failed',
+}
+
+def count_fingers(hand_landmarks):
+    tip_ids = [4, 8, 12, 16, 20]
+    fingers = []
+
+    # Jempol (Logika untuk tangan kanan, bisa dibalik jika perlu)
+    if hand_landmarks.landmark[tip_ids[0]].x < hand_landmarks.landmark[tip_ids[0] - 1].x:
+        fingers.append(1)
+    else:
+        fingers.append(0)
+
+    # 4 Jari Lainnya
+    for id in range(1, 5):
+        if hand_landmarks.landmark[tip_ids[id]].y < hand_landmarks.landmark[tip_ids[id] - 2].y:
+            fingers.append(1)
+        else:
+            fingers.append(0)
+
+    return fingers.count(1)
+
+def target_gesture(app_mode, total_fingers):
+    """Menentukan (target_state, pesan, warna) dari jumlah jari sesuai mode."""
+    # --- MODE REGISTRASI ---
+    if app_mode == 'register_scan':
+        if total_fingers == 5:
+            return 'validating_reg', "TAHAN 5 JARI...", (0, 255, 0)
+        return None, "Tunjukkan 5 Jari", (0, 255, 255)
+
+    # --- MODE PEMBAYARAN ---
+    if app_mode == 'payment_scan':
+        if total_fingers == 5:
+            return 'validating_pay_success', "VERIFIKASI...", (0, 255, 0)
+        if total_fingers == 3 or total_fingers == 4:
+            return 'validating_pay_fail', "CEK DATABASE...", (0, 0, 255)
+        return None, "Scan Jari Anda", (0, 255, 255)
+
+    return None, "", (255, 255, 255)
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+class ImageSequenceSource:
+    """
+    Sumber frame dari folder atau pola glob gambar (frame_0001.jpg, ...).
+    Interface-nya meniru cv2.VideoCapture (read/get/release) agar bisa saling tukar.
+    """
+
+    def __init__(self, pattern, fps=30.0):
+        if os.path.isdir(pattern):
+            paths = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            paths = glob.glob(pattern)
+        self.paths = sorted(p for p in paths if p.lower().endswith(IMAGE_EXTENSIONS))
+        self.fps = fps
+        self.index = 0
+
+    def isOpened(self):
+        return bool(self.paths)
+
+    def read(self):
+        if self.index >= len(self.paths):
+            return False, None
+        frame = cv2.imread(self.paths[self.index])
+        self.index += 1
+        return frame is not None, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self.paths)
+        return 0.0
+
+    def release(self):
+        self.paths = []
+
+def open_frame_source(source):
+    """
+    Membuka sumber frame:
+    - int (0, 1, ...)          -> webcam
+    - folder / pola glob (*)   -> ImageSequenceSource
+    - selain itu (file video, rtsp://...) -> cv2.VideoCapture
+    """
+    if isinstance(source, str) and (os.path.isdir(source) or any(c in source for c in '*?[')):
+        return ImageSequenceSource(source)
+    return cv2.VideoCapture(source)
+
+
+class KioskSession:
+    """
+    State mesin gesture/transaksi untuk SATU kiosk (satu kamera + satu kasir).
+    Semua transisi state lewat self.lock, jadi aman dipanggil dari route Flask
+    dan generator frame yang berjalan di thread berbeda.
+    """
+
+    def __init__(self, kiosk_id, source=0, clock=time.time):
+        self.kiosk_id = kiosk_id
+        self.source = source
+        # Sumber waktu timer gesture; benchmark offline bisa memakai waktu video
+        self.clock = clock
+        self.lock = threading.RLock()
+
+        # Data User Sementara
+        self.user_data = {"name": "", "nim": ""}
+        self.current_item = ""
+
+        # Status Aplikasi
+        self.app_mode = "idle"
+        self.process_status = None
+
+        # Variabel Timer
+        self.state_start_time = None
+        self.current_gesture_state = None
+
+        # Kamera & MediaPipe dibuka saat frame pertama diminta.
+        # Graph MediaPipe tidak thread-safe -> satu instance per kiosk, dijaga camera_lock.
+        self.camera = None
+        self.hands = None
+        self.camera_lock = threading.Lock()
+
+        # Client SSE milik kiosk ini
+        self.subscribers = []
+        self.last_progress_sent = 0.0
+
+    # ==========================================
+    # TRANSISI STATE (dipanggil dari route)
+    # ==========================================
+    def start_registration(self, name, nim):
+        with self.lock:
+            self.user_data = {"name": name, "nim": nim}
+            self._start_mode('register_scan')
+
+    def start_payment(self, item):
+        with self.lock:
+            self.current_item = item
+            self._start_mode('payment_scan')
+
+    def reset(self):
+        with self.lock:
+            self.app_mode = "idle"
+            self.process_status = None
+            self.current_gesture_state = None
+            self.state_start_time = None
+            self.publish_event("mode", self.snapshot())
+
+    def _start_mode(self, mode):
+        self.app_mode = mode
+        self.process_status = None
+        self.current_gesture_state = None
+        self.state_start_time = None
+        self.publish_event("mode", self.snapshot())
+
+    def snapshot(self):
+        """Ringkasan status saat ini (dipakai /check_status dan event awal stream)"""
+        with self.lock:
+            return {
+                "kiosk": self.kiosk_id,
+                "mode": self.app_mode,
+                "status": self.process_status or "waiting",
+                "user": dict(self.user_data),
+                "item": self.current_item,
+            }
+
+    # ==========================================
+    # TRANSISI STATE (dipanggil dari frame loop)
+    # ==========================================
+    def is_scanning(self):
+        with self.lock:
+            return self.app_mode != "idle" and self.process_status is None
+
+    def update_gesture(self, total_fingers):
+        """
+        Memproses satu deteksi tangan. Return (target_state, msg, color, elapsed).
+        elapsed = None jika tidak ada gesture valid yang sedang ditahan.
+        """
+        with self.lock:
+            # Status bisa berubah (reset / hasil dari tangan lain) sejak frame dibaca
+            if self.app_mode == "idle" or self.process_status is not None:
+                return None, "", (255, 255, 255), None
+
+            target_state, msg, color = target_gesture(self.app_mode, total_fingers)
+
+            if not target_state:
+                self.clear_gesture()
+                return None, msg, color, None
+
+            state_changed = self.current_gesture_state != target_state
+            if state_changed:
+                self.current_gesture_state = target_state
+                self.state_start_time = self.clock()
+
+            elapsed = self.clock() - self.state_start_time
+            self._publish_progress(target_state, elapsed, force=state_changed)
+
+            if elapsed >= REQUIRED_HOLD_TIME:
+                self.process_status = FINAL_STATUS[target_state]
+                self.publish_event("result", self.snapshot())
+
+            return target_state, msg, color, elapsed
+
+    def clear_gesture(self):
+        """Tangan hilang / gesture tidak valid -> timer diulang."""
+        with self.lock:
+            if self.current_gesture_state is not None:
+                self._publish_progress(None, 0.0, force=True)
+            self.current_gesture_state = None
+            self.state_start_time = None
+
+    # ==========================================
+    # PUSH STATUS (SSE)
+    # ==========================================
+    def subscribe(self):
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self.lock:
+            self.subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.subscribers.remove(q)
+
+    def publish_event(self, event, data):
+        """
+        Kirim event ke semua client SSE. Jika antrian client lambat penuh:
+        - event 'progress' dilewati (progress berikutnya menggantikannya),
+        - event lain (mode/result) menggeser progress yang masih tertunda; jika tetap penuh,
+          antrian dikosongkan dan diberi penanda tutup (None) -> stream ditutup, EventSource
+          reconnect dan menerima snapshot 'status' terbaru.
+        """
+        with self.lock:
+            for q in self.subscribers:
+                try:
+                    q.put_nowait((event, data))
+                except queue.Full:
+                    if event == "progress":
+                        continue
+                    with q.mutex:
+                        if None in q.queue:
+                            continue   # stream sudah ditandai tutup
+                        pending = [item for item in q.queue if item[0] != "progress"]
+                        if len(pending) >= SUBSCRIBER_QUEUE_SIZE:
+                            pending = [None]
+                        else:
+                            pending.append((event, data))
+                        q.queue.clear()
+                        q.queue.extend(pending)
+                        q.not_empty.notify()
+
+    def _publish_progress(self, target_state, elapsed, force=False):
+        now = self.clock()
+        if not force and now - self.last_progress_sent < PROGRESS_INTERVAL:
+            return
+        self.last_progress_sent = now
+        self.publish_event("progress", {
+            "kiosk": self.kiosk_id,
+            "mode": self.app_mode,
+            "target_state": target_state,
+            "elapsed": round(min(elapsed, REQUIRED_HOLD_TIME), 2),
+            "required": REQUIRED_HOLD_TIME,
+        })
+
+    # ==========================================
+    # PIPELINE VIDEO
+    # ==========================================
+    def open(self):
+        if self.camera is None:
+            self.camera = open_frame_source(self.source)
+        if self.hands is None:
+            self.hands = mp_hands.Hands(min_detection_confidence=0.7, min_tracking_confidence=0.5)
+
+    def process_frame(self, frame, timings=None):
+        """
+        Menjalankan deteksi gesture pada satu frame BGR dan menggambar overlay.
+        Jika timings (dict) diberikan, durasi tiap tahap (detik) dicatat ke situ:
+        'flip_convert', 'hands', 'draw'.
+        """
+        t0 = time.perf_counter()
+        frame = cv2.flip(frame, 1)
+        img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        t1 = time.perf_counter()
+        results = self.hands.process(img_rgb)
+        t2 = time.perf_counter()
+
+        # --- LOGIKA UTAMA ---
+        if self.is_scanning():
+
+            # Header Text di Video
+            header_text = "MODE: REGISTRASI" if self.app_mode == 'register_scan' else "MODE: PEMBAYARAN"
+            cv2.putText(frame, header_text, (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 0), 2)
+
+            if results.multi_hand_landmarks:
+                for hand_landmarks in results.multi_hand_landmarks:
+                    mp_draw.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+                    total_fingers = count_fingers(hand_landmarks)
+
+                    target_state, msg, color, elapsed = self.update_gesture(total_fingers)
+
+                    # --- TIMER PROSES ---
+                    if target_state:
+                        # Loading Bar Visual
+                        bar_width = int(300 * (min(elapsed, REQUIRED_HOLD_TIME)/REQUIRED_HOLD_TIME))
+                        cv2.rectangle(frame, (50, 60), (50 + bar_width, 80), color, -1)
+                        cv2.rectangle(frame, (50, 60), (350, 80), (255, 255, 255), 2)
+                        cv2.putText(frame, msg, (50, 110), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+                    elif msg:
+                        cv2.putText(frame, msg, (20, 400), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+            else:
+                self.clear_gesture()
+                cv2.putText(frame, "Arahkan Tangan...", (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+
+        # --- FEEDBACK HASIL AKHIR ---
+        process_status = self.process_status
+        if process_status == 'reg_success':
+            cv2.putText(frame, "TERDAFTAR!", (150, 240), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 255, 0), 4)
+        elif process_status == 'pay_success':
+            cv2.putText(frame, "LUNAS!", (200, 240), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 255, 0), 4)
+        elif process_status == 'pay_failed':
+            cv2.putText(frame, "GAGAL!", (200, 240), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 255), 4)
+
+        if timings is not None:
+            timings['flip_convert'] = t1 - t0
+            timings['hands'] = t2 - t1
+            timings['draw'] = time.perf_counter() - t2
+        return frame
+
+    def generate_frames(self):
+        while True:
+            with self.camera_lock:
+                self.open()
+                success, frame = self.camera.read()
+                if not success:
+                    break
+                frame = self.process_frame(frame)
+
+            ret, buffer = cv2.imencode('.jpg', frame)
+            frame = buffer.tobytes()
+            yield (b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+
+
+class KioskRegistry:
+    """Daftar kiosk yang dilayani satu proses backend: kiosk_id -> sumber kamera."""
+
+    def __init__(self, sources):
+        self.sources = dict(sources)
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def get(self, kiosk_id):
+        """Session untuk kiosk_id (dibuat saat pertama dipakai), None jika tidak terdaftar."""
+        if kiosk_id not in self.sources:
+            return None
+        with self.lock:
+            session = self.sessions.get(kiosk_id)
+            if session is None:
+                session = KioskSession(kiosk_id, self.sources[kiosk_id])
+                self.sessions[kiosk_id] = session
+            return session
+
+def parse_sources(spec):
+    """
+    Format: "kasir1=0,kasir2=1,pintu=rtsp://..." -> {"kasir1": 0, "kasir2": 1, ...}
+    Angka dianggap index webcam, selain itu diteruskan apa adanya ke VideoCapture.
+    """
+    sources = {}
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        kiosk_id, _, source = part.partition('=')
+        source = source.strip()
+        sources[kiosk_id.strip()] = int(source) if source.isdigit() else source
+    return sources
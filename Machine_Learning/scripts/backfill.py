@@ -0,0 +1,268 @@
+"""
+Backfill: skor ulang riwayat sensor_logs setelah model (prediksi.pkl) atau
+rules (kompos_config.json) berubah.
+
+Contoh:
+    python backfill.py                      # lanjut dari checkpoint terakhir
+    python backfill.py --reset --workers 8  # mulai dari awal, 8 halaman paralel
+    python backfill.py --dry-run --limit 5  # cek hasil 5 halaman tanpa menulis
+
+Cara kerja:
+- sensor_logs dibaca per halaman urut key (order_by_key + limit_to_first), tidak sekaligus.
+- Tiap halaman: prediksi ammonia & maturity sekali panggil untuk semua baris (batch),
+  lalu fuzzy versi vektor (fuzzy_engine.*_batch).
+- Hasil ditulis dengan satu multi-path update per halaman.
+- Checkpoint (key terakhir yang SUDAH tertulis) disimpan setelah tiap halaman selesai,
+  jadi job bisa dihentikan dan dilanjutkan kapan saja.
+- Setelah semua halaman selesai, bucket sensor_rollups pada hari yang berisi baris
+  ter-rollup (ROLLUP_FLAG) dihitung ulang agar ammonia/score di grafik riwayat ikut
+  berubah (rollup.bangun_ulang_rollup). Jika sensor_logs hanya berisi titik hasil kompresi
+  (compression.method di config) atau sebagian sudah dihapus retensi, statistiknya
+  diperkirakan dari rekonstruksi deret titik tersimpan.
+  Hari yang belum lewat 1 jam ditunda ke run berikutnya (bucket masih dipegang bridge).
+Memori dibatasi: paling banyak 2 x workers halaman berada di memori.
+"""
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import firebase_admin
+from firebase_admin import credentials, db
+import joblib
+import numpy as np
+import pandas as pd
+
+from fuzzy_engine import hitung_membership_batch, evaluasi_rules_batch, defuzzifikasi_batch, label_fuzzy_batch
+from rollup import ROLLUP_FLAG, bangun_ulang_rollup
+
+CRED_PATH = 'komposproject-dfe5e-firebase-adminsdk-fbsvc-235f1caa0c.json'
+DATABASE_URL = 'https://komposproject-dfe5e-default-rtdb.asia-southeast1.firebasedatabase.app'
+
+DAY_MS = 86400 * 1000
+ROLLUP_REBUILD_DELAY_MS = 3600 * 1000
+
+
+def iter_halaman(ref, page_size, start_after=None):
+    """
+    Generator halaman (list of (key, value)) urut key dari sebuah reference.
+    start_after: key terakhir yang sudah diproses (tidak ikut dikembalikan).
+    """
+    last_key = start_after
+    while True:
+        query = ref.order_by_key()
+        if last_key is not None:
+            # start_at inklusif -> ambil satu lebih lalu buang key pertama
+            page = query.start_at(last_key).limit_to_first(page_size + 1).get() or {}
+            items = [(k, v) for k, v in page.items() if k != last_key]
+        else:
+            page = query.limit_to_first(page_size).get() or {}
+            items = list(page.items())
+        if not items:
+            return
+        yield items
+        last_key = items[-1][0]
+        if len(items) < page_size:
+            return
+
+
+def muat_model(model_path):
+    """Sama seperti bridge_ml.py: dict berisi beberapa model atau satu model ammonia."""
+    loaded_object = joblib.load(model_path)
+    model_ammonia = model_maturity = None
+    if isinstance(loaded_object, dict):
+        model_ammonia = loaded_object.get('rf_regressor_ammonia') or loaded_object.get('lgbm_ammonia')
+        model_maturity = loaded_object.get('rf_classifier_maturity')
+    else:
+        model_ammonia = loaded_object
+    if model_ammonia is None:
+        raise RuntimeError("Model Ammonia tidak ditemukan di " + model_path)
+    return model_ammonia, model_maturity
+
+
+def skor_halaman(items, model_ammonia, model_maturity, rules):
+    """Skor ulang satu halaman. Return multi-path update {'<key>/<field>': nilai}."""
+    rows = [(k, v) for k, v in items
+            if isinstance(v, dict) and all(isinstance(v.get(f), (int, float)) for f in ('suhu', 'moisture', 'ph'))]
+    if not rows:
+        return {}
+
+    keys = [k for k, _ in rows]
+    suhu = np.array([v['suhu'] for _, v in rows], dtype=float)
+    moisture = np.array([v['moisture'] for _, v in rows], dtype=float)
+    ph = np.array([v['ph'] for _, v in rows], dtype=float)
+    bau = np.array([v.get('bau', 0) or 0 for _, v in rows], dtype=float)
+
+    # --- Prediksi AMMONIA (batch) ---
+    features = pd.DataFrame({'Temperature': suhu, 'MC(%)': moisture, 'pH': ph})
+    ammonia = np.maximum(0.0, model_ammonia.predict(features)) / 40.0 # Normalisasi (sama dengan bridge)
+
+    # --- Prediksi MATURITY (batch) ---
+    maturity = np.full(len(rows), "Unknown", dtype=object)
+    if model_maturity is not None:
+        try:
+            features['Ammonia(mg/kg)'] = ammonia
+            pred = model_maturity.predict(features[['Temperature', 'MC(%)', 'pH', 'Ammonia(mg/kg)']])
+            maturity = np.where(pred == 1, "Matang", "Belum Matang")
+        except Exception as e:
+            print(f"⚠️ Prediksi maturity gagal, dilewati: {e}")
+
+    # --- FUZZY (vektor) ---
+    mu = hitung_membership_batch(suhu, moisture, ph, ammonia, bau)
+    scores = defuzzifikasi_batch(evaluasi_rules_batch(mu, rules))
+    labels = label_fuzzy_batch(scores)
+    alarm = np.maximum(mu['ammo_tinggi'], mu['bau_menyengat']) > 0
+
+    updates = {}
+    for i, key in enumerate(keys):
+        score = round(float(scores[i]), 2)
+        updates[f"{key}/ammonia"] = round(float(ammonia[i]), 2)
+        updates[f"{key}/fuzzy_score"] = score
+        updates[f"{key}/score"] = score
+        updates[f"{key}/fuzzy_label"] = str(labels[i])
+        updates[f"{key}/maturity"] = str(maturity[i])
+        updates[f"{key}/alarm"] = bool(alarm[i])
+    return updates
+
+
+def tulis_dengan_retry(ref, updates, retries=5):
+    delay = 1.0
+    for attempt in range(retries):
+        try:
+            ref.update(updates)
+            return
+        except Exception as e:
+            if attempt == retries - 1:
+                raise
+            print(f"⚠️ Gagal tulis ({e}), coba lagi {delay:.0f} detik...")
+            time.sleep(delay)
+            delay *= 2
+
+
+def baca_checkpoint(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'last_key': None, 'processed': 0, 'rollup_days': []}
+
+
+def simpan_checkpoint(path, state):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def hari_rollup(items, updates):
+    """Awal hari (ms UTC) dari baris yang diskor ulang dan sudah masuk sensor_rollups."""
+    days = set()
+    for key, row in items:
+        if isinstance(row, dict) and row.get(ROLLUP_FLAG) and f"{key}/score" in updates \
+                and isinstance(row.get('timestamp'), (int, float)):
+            timestamp = int(row['timestamp'])
+            days.add(timestamp - timestamp % DAY_MS)
+    return days
+
+
+def bangun_ulang_rollup_harian(ref_logs, ref_rollups, state, checkpoint_path, dry_run=False,
+                               compression_method='swinging_door'):
+    """Hitung ulang sensor_rollups untuk hari di state['rollup_days']; hari selesai dihapus dari state."""
+    ready_before = int(time.time() * 1000) - ROLLUP_REBUILD_DELAY_MS
+    days = [day for day in sorted(state['rollup_days']) if day + DAY_MS <= ready_before]
+    if dry_run:
+        print(f"🧮 (dry-run) {len(days)} hari rollup akan dihitung ulang.")
+        return
+    exact = approx = skipped = 0
+    for day in days:
+        n_exact, n_approx, n_skipped = bangun_ulang_rollup(ref_logs, ref_rollups, day, day + DAY_MS,
+                                                           method=compression_method)
+        exact += n_exact
+        approx += n_approx
+        skipped += n_skipped
+        state['rollup_days'].remove(day)
+        simpan_checkpoint(checkpoint_path, state)
+    if state['rollup_days']:
+        print(f"⏳ {len(state['rollup_days'])} hari rollup menunggu run berikutnya.")
+    print(f"🧮 Rollup dihitung ulang: {exact} field-bucket tepat, {approx} perkiraan dari titik terkompresi, "
+          f"{skipped} dilewati (tidak ada data mentah).")
+
+
+def jalankan_backfill(ref_logs, model_ammonia, model_maturity, rules, page_size=1000, workers=4,
+                      checkpoint_path='backfill.ckpt', dry_run=False, limit=None, ref_rollups=None,
+                      compression_method='swinging_door'):
+    state = baca_checkpoint(checkpoint_path)
+    state.setdefault('rollup_days', [])
+    if state['last_key']:
+        print(f"↪️ Melanjutkan setelah key {state['last_key']} ({state['processed']} data sudah diproses).")
+
+    def proses(items):
+        updates = skor_halaman(items, model_ammonia, model_maturity, rules)
+        if updates and not dry_run:
+            tulis_dengan_retry(ref_logs, updates)
+        return len(items), hari_rollup(items, updates)
+
+    t0 = time.time()
+    pending = deque()   # (future, key terakhir halaman), urut key
+    pages = 0
+
+    def selesaikan(wait_all=False):
+        # Checkpoint hanya maju untuk halaman yang berurutan sudah selesai
+        while pending and (wait_all or pending[0][0].done() or len(pending) >= workers * 2):
+            future, last_key = pending.popleft()
+            processed, days = future.result()
+            state['processed'] += processed
+            state['rollup_days'] = sorted(set(state['rollup_days']) | days)
+            state['last_key'] = last_key
+            if not dry_run:
+                simpan_checkpoint(checkpoint_path, state)
+            rate = state['processed'] / max(time.time() - t0, 1e-9)
+            print(f"✅ s/d {last_key}: total {state['processed']} data ({rate:.0f} data/detik)")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for items in iter_halaman(ref_logs, page_size, start_after=state['last_key']):
+            pending.append((executor.submit(proses, items), items[-1][0]))
+            pages += 1
+            selesaikan()
+            if limit is not None and pages >= limit:
+                break
+        selesaikan(wait_all=True)
+
+    if ref_rollups is not None:
+        bangun_ulang_rollup_harian(ref_logs, ref_rollups, state, checkpoint_path, dry_run, compression_method)
+    print(f"🏁 Backfill selesai: {state['processed']} data dalam {time.time() - t0:.1f} detik.")
+    return state
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Skor ulang riwayat sensor_logs dengan model & rules terbaru.")
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=4, help="Jumlah halaman yang diproses paralel")
+    parser.add_argument('--checkpoint', default='backfill.ckpt')
+    parser.add_argument('--reset', action='store_true', help="Abaikan checkpoint, mulai dari awal")
+    parser.add_argument('--dry-run', action='store_true', help="Hitung saja, tidak menulis ke Firebase")
+    parser.add_argument('--limit', type=int, default=None, help="Maksimal jumlah halaman")
+    parser.add_argument('--no-rollups', action='store_true', help="Jangan hitung ulang sensor_rollups")
+    parser.add_argument('--model', default='prediksi.pkl')
+    parser.add_argument('--config', default='kompos_config.json')
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+    rules = config['rules']
+    model_ammonia, model_maturity = muat_model(args.model)
+    print("🚀 Model & rules siap.")
+
+    if args.reset and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    cred = credentials.Certificate(CRED_PATH)
+    firebase_admin.initialize_app(cred, {'databaseURL': DATABASE_URL})
+
+    jalankan_backfill(db.reference('sensor_logs'), model_ammonia, model_maturity, rules,
+                      page_size=args.page_size, workers=args.workers, checkpoint_path=args.checkpoint,
+                      dry_run=args.dry_run, limit=args.limit,
+                      ref_rollups=None if args.no_rollups else db.reference('sensor_rollups'),
+                      compression_method=config.get('compression', {}).get('method', 'swinging_door'))
@@ -0,0 +1,178 @@
+"""
+Uji scale-out bridge secara lokal dengan broker tiruan (tanpa MQTT & Firebase).
+
+Contoh:
+    python bench_cluster.py --messages 20000 --devices 200 --instances 1 2 4 --mode partition
+
+Broker tiruan meniru perilaku broker MQTT:
+- partition : setiap instance menerima SEMUA pesan (subscription biasa) lalu memfilter
+              device miliknya dengan cluster.partisi_device().
+- shared    : pesan dibagi round-robin antar instance ($share/<group>/...).
+Tiap instance adalah proses terpisah yang men-decode payload dan menjalankan
+fuzzy inference penuh (bagian CPU terberat bridge; model ML tidak dimuat).
+
+Laporan: throughput (pesan/detik), efisiensi scaling terhadap 1 instance,
+pelanggaran urutan per device, dan jumlah device yang terpecah ke >1 instance.
+Efisiensi wall-clock hanya bermakna jika CPU >= jumlah instance. Karena itu juga
+dilaporkan efisiensi CPU: waktu CPU 1 instance / (n x waktu CPU instance tersibuk),
+yaitu speedup maksimum jika tiap instance punya core sendiri (bisa diukur di 1 core).
+
+--min-efficiency X: exit code 1 jika efisiensi (wall-clock bila core cukup, selain itu
+CPU) di bawah X, atau ada pelanggaran urutan / device terpecah di mode partition.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import sys
+import time
+
+from cluster import ClusterConfig
+from fuzzy_engine import hitung_membership, evaluasi_rules, defuzzifikasi
+from sensor_codec import decode_payload
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'kompos_config.json')
+
+
+def buat_pesan(n_messages, n_devices, seed=42):
+    """Payload JSON berurutan per device (field 'seq' untuk cek urutan)."""
+    rng = random.Random(seed)
+    seq = {}
+    messages = []
+    for _ in range(n_messages):
+        device_id = f"esp-{rng.randrange(n_devices):04d}"
+        seq[device_id] = seq.get(device_id, 0) + 1
+        payload = json.dumps({
+            'device_id': device_id,
+            'seq': seq[device_id],
+            'suhu': round(rng.uniform(20, 70), 2),
+            'moisture': round(rng.uniform(20, 80), 2),
+            'ph': round(rng.uniform(4, 10), 2),
+        }).encode('utf-8')
+        messages.append(payload)
+    return messages
+
+
+def worker(instance_id, size, mode, inbox, results, rules):
+    config = ClusterConfig(mode, instance_id, size)
+    last_seq = {}
+    processed = 0
+    violations = 0
+    busy = 0.0
+
+    results.put(('ready', instance_id))
+    while True:
+        batch = inbox.get()
+        if batch is None:
+            break
+        t0 = time.process_time()
+        for payload in batch:
+            for data in decode_payload(payload):
+                device_id = data['device_id']
+                if not config.milik_instance(device_id):
+                    continue
+                if data['seq'] <= last_seq.get(device_id, 0):
+                    violations += 1
+                last_seq[device_id] = data['seq']
+
+                mu = hitung_membership(data['suhu'], data['moisture'], data['ph'], 0.0, 0)
+                defuzzifikasi(evaluasi_rules(mu, rules))
+                processed += 1
+        busy += time.process_time() - t0
+
+    results.put(('done', instance_id, processed, violations, busy, sorted(last_seq)))
+
+
+def jalankan(messages, n_instances, mode, batch_size, rules):
+    results = mp.Queue()
+    inboxes = [mp.Queue() for _ in range(n_instances)]
+    procs = [mp.Process(target=worker, args=(i, n_instances, mode, inboxes[i], results, rules))
+             for i in range(n_instances)]
+    for p in procs:
+        p.start()
+    for _ in procs:
+        results.get()   # tunggu semua instance siap
+
+    t0 = time.perf_counter()
+    # --- Broker tiruan ---
+    if mode == 'shared':
+        buckets = [[] for _ in range(n_instances)]
+        for i, payload in enumerate(messages):
+            target = i % n_instances
+            buckets[target].append(payload)
+            if len(buckets[target]) >= batch_size:
+                inboxes[target].put(buckets[target])
+                buckets[target] = []
+        for target, bucket in enumerate(buckets):
+            if bucket:
+                inboxes[target].put(bucket)
+    else:
+        for start in range(0, len(messages), batch_size):
+            batch = messages[start:start + batch_size]
+            for inbox in inboxes:
+                inbox.put(batch)
+    for inbox in inboxes:
+        inbox.put(None)
+
+    done = [results.get() for _ in procs]
+    elapsed = time.perf_counter() - t0
+    for p in procs:
+        p.join()
+
+    processed = sum(d[2] for d in done)
+    violations = sum(d[3] for d in done)
+    owners = {}
+    for d in done:
+        for device_id in d[5]:
+            owners[device_id] = owners.get(device_id, 0) + 1
+    split = sum(1 for n in owners.values() if n > 1)
+    return {
+        'instances': n_instances,
+        'processed': processed,
+        'elapsed_s': round(elapsed, 3),
+        'throughput': round(processed / elapsed, 1) if elapsed else 0.0,
+        'order_violations': violations,
+        'split_devices': split,
+        'busy_s': [round(d[4], 3) for d in sorted(done, key=lambda d: d[1])],
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark scale-out bridge dengan broker tiruan.")
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--devices', type=int, default=200)
+    parser.add_argument('--instances', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--mode', choices=['partition', 'shared'], default='partition')
+    parser.add_argument('--batch', type=int, default=200, help="Jumlah pesan per kiriman broker tiruan")
+    parser.add_argument('--min-efficiency', type=float, default=None, help="Gagal jika efisiensi di bawah nilai ini (0-1)")
+    args = parser.parse_args()
+
+    with open(CONFIG_PATH, 'r') as f:
+        rules = json.load(f)['rules']
+
+    messages = buat_pesan(args.messages, args.devices)
+    print(f"📨 {len(messages)} pesan, {args.devices} device, mode {args.mode}, CPU tersedia: {os.cpu_count()}")
+
+    baseline = baseline_cpu = None
+    failed = False
+    for n in args.instances:
+        res = jalankan(messages, n, args.mode, args.batch, rules)
+        if baseline is None:
+            baseline = res['throughput'] / res['instances']
+            baseline_cpu = sum(res['busy_s']) * res['instances']
+        efficiency = res['throughput'] / (baseline * n) if baseline else 0.0
+        cpu_efficiency = baseline_cpu / (n * max(res['busy_s'])) if max(res['busy_s']) else 0.0
+        print(f"   {n} instance: {res['throughput']:>10.1f} pesan/detik  "
+              f"(efisiensi {efficiency:.0%}, efisiensi CPU {cpu_efficiency:.0%}, urutan salah {res['order_violations']}, "
+              f"device terpecah {res['split_devices']}, CPU {res['busy_s']} detik)")
+
+        if args.min_efficiency is not None:
+            measured = efficiency if (os.cpu_count() or 1) >= n else cpu_efficiency
+            if measured < args.min_efficiency:
+                print(f"❌ Efisiensi {measured:.0%} < {args.min_efficiency:.0%} untuk {n} instance")
+                failed = True
+            if args.mode == 'partition' and (res['order_violations'] or res['split_devices']):
+                print(f"❌ Mode partition: urutan / kepemilikan device tidak konsisten untuk {n} instance")
+                failed = True
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,61 @@
+"""
+Benchmark decode payload sensor: JSON vs biner v1 (struct / NumPy).
+
+Contoh:
+    python bench_codec.py --messages 100000 --batch 1 64
+
+Untuk tiap ukuran batch (record per pesan) dilaporkan waktu decode per record
+dari decode_payload() (jalur yang dipakai bridge), dibandingkan dengan JSON
+dan jalur NumPy (array_to_records(decode_array())) yang dipaksa.
+"""
+import argparse
+import json
+import random
+import time
+
+from sensor_codec import array_to_records, decode_array, decode_payload, decode_records, encode_readings
+
+
+def buat_pembacaan(n, seed=42):
+    rng = random.Random(seed)
+    return [{'device_id': rng.randrange(1, 2 ** 32), 'timestamp': 1714521600 + i,
+             'suhu': round(rng.uniform(20, 70), 2), 'moisture': round(rng.uniform(20, 80), 2),
+             'ph': round(rng.uniform(4, 10), 2)} for i in range(n)]
+
+
+def ukur(fn, payloads):
+    t0 = time.perf_counter()
+    records = 0
+    for payload in payloads:
+        records += len(fn(payload))
+    return (time.perf_counter() - t0) / records * 1e6
+
+
+def jalankan(n_messages, batch):
+    readings = buat_pembacaan(n_messages * batch)
+    groups = [readings[i:i + batch] for i in range(0, len(readings), batch)]
+    json_payloads = [json.dumps(g[0] if batch == 1 else g).encode('utf-8') for g in groups]
+    binary_payloads = [encode_readings(g) for g in groups]
+    return {
+        'batch': batch,
+        'json_bytes': round(sum(map(len, json_payloads)) / len(readings), 1),
+        'binary_bytes': round(sum(map(len, binary_payloads)) / len(readings), 1),
+        'json_us': round(ukur(decode_payload, json_payloads), 3),
+        'decode_payload_us': round(ukur(decode_payload, binary_payloads), 3),
+        'struct_us': round(ukur(decode_records, binary_payloads), 3),
+        'numpy_us': round(ukur(lambda p: array_to_records(decode_array(p)), binary_payloads), 3),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark decode payload sensor.")
+    parser.add_argument('--messages', type=int, default=50000)
+    parser.add_argument('--batch', type=int, nargs='+', default=[1, 8, 64])
+    args = parser.parse_args()
+
+    for batch in args.batch:
+        n_messages = max(args.messages // batch, 1)
+        result = jalankan(n_messages, batch)
+        print(f"📦 {batch} record/pesan: JSON {result['json_bytes']} B, biner {result['binary_bytes']} B per record")
+        print(f"   decode per record: JSON {result['json_us']} µs | decode_payload {result['decode_payload_us']} µs"
+              f" | struct {result['struct_us']} µs | NumPy {result['numpy_us']} µs")
@@ -1,108 +1,21 @@
 import json
+import math
+import threading
 import time
-import paho.mqtt.client as mqtt
 import firebase_admin
 from firebase_admin import credentials, db
 import joblib
 import pandas as pd
 import numpy as np
 import os
-
-# ==========================================
-# 0. FUZZY LOGIC ENGINE (Integrated)
-# ==========================================
-def trapmf(x, params):
-    """Trapezoidal Membership Function"""
-    a, b, c, d = params
-    if x <= a or x >= d: return 0.0
-    if a < x < b: return (x - a) / (b - a)
-    if c < x < d: return (d - x) / (d - c)
-    return 1.0
-
-def trimf(x, params):
-    """Triangular Membership Function"""
-    a, b, c = params
-    if x <= a or x >= c: return 0.0
-    if a < x <= b: return (x - a) / (b - a)
-    if b < x < c: return (c - x) / (c - b)
-    return 0.0
-
-def hitung_membership(suhu, moisture, ph, ammonia, bau_val):
-    """Menghitung derajat keanggotaan (Fuzzification)."""
-    mu = {}
-
-    # --- SUHU ---
-    mu['suhu_dingin'] = trapmf(suhu, [0, 0, 28, 35]) 
-    mu['suhu_ideal']  = trimf(suhu, [30, 45, 55])
-    mu['suhu_panas']  = trapmf(suhu, [50, 60, 80, 80])
-
-    # --- KELEMBAPAN (MOISTURE) ---
-    mu['kelembapan_kering'] = trapmf(moisture, [0, 0, 30, 40])
-    mu['kelembapan_sedang'] = trimf(moisture, [40, 46, 52]) 
-    mu['kelembapan_basah']  = trapmf(moisture, [50, 60, 100, 100])
-
-    # --- PH ---
-    mu['ph_asam']   = trapmf(ph, [0, 0, 5, 6])
-    mu['ph_netral'] = trimf(ph, [5.0, 7.0, 9.0])
-    mu['ph_basa']   = trapmf(ph, [8, 9, 14, 14])
-
-    # --- VARIABEL SAFETY (AMMONIA & BAU) ---
-    mu['ammo_tinggi']   = trapmf(ammonia, [25, 30, 50, 50])
-    mu['bau_menyengat'] = trapmf(bau_val, [6, 8, 10, 10])
-
-    return mu
-
-def evaluasi_rules(mu, rules_json):
-    """Inference Engine berdasarkan JSON"""
-    aggregated = {'buruk': 0.0, 'sedang': 0.0, 'baik': 0.0, 'sangat_baik': 0.0}
-
-    # 1. Safety Override
-    bad_factor = max(mu['ammo_tinggi'], mu['bau_menyengat'])
-    if bad_factor > 0:
-        aggregated['buruk'] = bad_factor
-
-    # 2. Iterasi Rules
-    for rule in rules_json:
-        c_ph = "ph_" + rule['if']['ph'].lower()
-        c_suhu = "suhu_" + rule['if']['suhu'].lower()
-        c_mois = "kelembapan_" + rule['if']['kelembapan'].lower()
-        
-        target = rule['then'].lower().replace(" ", "_")
-
-        val_ph = mu.get(c_ph, 0)
-        val_suhu = mu.get(c_suhu, 0)
-        val_mois = mu.get(c_mois, 0)
-        
-        strength = min(val_ph, val_suhu, val_mois)
-
-        if target in aggregated:
-            aggregated[target] = max(aggregated[target], strength)
-
-    return aggregated
-
-def defuzzifikasi(aggregated):
-    """Menghitung Crisp Output (Score 0-100)"""
-    numerator = 0.0
-    denominator = 0.0
-    
-    for x in range(101):
-        mu_buruk  = trapmf(x, [0, 0, 30, 50])
-        mu_sedang = trimf(x, [40, 60, 80])
-        mu_baik   = trimf(x, [70, 85, 95])
-        mu_sb     = trapmf(x, [90, 95, 100, 100])
-        
-        res_buruk  = min(aggregated['buruk'], mu_buruk)
-        res_sedang = min(aggregated['sedang'], mu_sedang)
-        res_baik   = min(aggregated['baik'], mu_baik)
-        res_sb     = min(aggregated['sangat_baik'], mu_sb)
-        
-        final_mu = max(res_buruk, res_sedang, res_baik, res_sb)
-        
-        numerator += x * final_mu
-        denominator += final_mu
-
-    if denominator == 0: return 0
-    return numerator / denominator
+from rollup import RollupManager, ROLLUP_FLAG, jalankan_retensi_periodik
+from sensor_codec import decode_payload
+from compression import SeriesCompressor
+from windowing import WindowAggregator
+from fault_detector import FaultDetector
+from store_forward import DiskQueue, StoreForward, buat_push_id, gabung_updates
+from fuzzy_engine import trapmf, hitung_membership, evaluasi_rules, defuzzifikasi, label_fuzzy
+import cluster
 
 # ==========================================
 # 1. KONFIGURASI DAN LOAD MODEL
@@ -111,10 +24,14 @@ print("⏳ Memuat paket model & konfigurasi...")
 
 # Load Fuzzy Config
 FUZZY_RULES = []
+COMPRESSION_CONFIG = {}
+FAULT_CONFIG = {}
 try:
     with open('kompos_config.json', 'r') as f:
         config_data = json.load(f)
         FUZZY_RULES = config_data['rules']
+        COMPRESSION_CONFIG = config_data.get('compression', {})
+        FAULT_CONFIG = config_data.get('fault_detection', {})
     print("✅ Fuzzy config loaded.")
 except Exception as e:
     print(f"⚠️ Warning: Gagal load kompos_config.json ({e}). Fuzzy logic mungkin tidak akurat.")
@@ -163,7 +80,48 @@ firebase_admin.initialize_app(cred, {
 })
 
 ref_logs = db.reference('sensor_logs') 
-ref_now = db.reference('sensor_now')   
+ref_rollups = db.reference('sensor_rollups') # Ringkasan 1m/10m/1h/1d untuk grafik riwayat panjang
+
+# Scale-out: beberapa instance bridge (lihat cluster.py)
+CLUSTER = cluster.ClusterConfig.from_env()
+
+# Store-and-forward: semua tulisan masuk antrian disk dulu (lokal, cepat),
+# lalu dikirim batch ke Firebase oleh thread terpisah. Tahan uplink putus & restart.
+# Tiap instance cluster punya file antrian sendiri.
+QUEUE_PATH = os.environ.get('QUEUE_PATH', os.path.join('antrian', f'bridge-{CLUSTER.instance_id}'))
+QUEUE_MAX_MB = int(os.environ.get('QUEUE_MAX_MB', 64))
+antrian = DiskQueue(QUEUE_PATH, QUEUE_MAX_MB * 1024 * 1024)
+
+def kirim_ke_firebase(items):
+    """Satu batch antrian -> satu multi-path update ke Firebase."""
+    updates = gabung_updates(items)
+    if updates:
+        db.reference().update(updates)
+
+pengirim = StoreForward(antrian, kirim_ke_firebase)
+print(f"📦 Antrian disk: {len(antrian)} item menunggu dikirim ({QUEUE_MAX_MB} MB maks).")
+
+# Retensi data mentah (hari), opt-in: tidak diset = data mentah disimpan selamanya.
+# Jika diset, data lama diagregasi dulu ke sensor_rollups sebelum dihapus (minimal 1 hari).
+RAW_RETENTION_DAYS = max(float(os.environ['RAW_RETENTION_DAYS']), 1) if os.environ.get('RAW_RETENTION_DAYS') else None
+# Bucket rollup pertama tiap device setelah start digabung dengan yang tersimpan di Firebase,
+# setelah update dari proses sebelumnya yang masih di antrian disk terkirim semua.
+SEQ_PROSES_LAMA = antrian.write_seq
+
+def muat_rollup(path):
+    if antrian.read_seq < SEQ_PROSES_LAMA:
+        raise RuntimeError(f"{SEQ_PROSES_LAMA - antrian.read_seq} update proses sebelumnya belum terkirim")
+    return ref_rollups.child(path).get()
+
+rollups = RollupManager(loader=muat_rollup)
+
+# Kompresi sebelum simpan ke sensor_logs (method "off" = simpan semua)
+kompresor = SeriesCompressor.from_config(COMPRESSION_CONFIG)
+print(f"🗜️ Kompresi sensor_logs: {kompresor.method}, toleransi {kompresor.tolerances}")
+
+# Deteksi sensor rusak sebelum skor (quarantine -> sensor_quarantine, flag -> field 'faults')
+detektor = FaultDetector.from_config(FAULT_CONFIG)
+print(f"🩺 Deteksi fault sensor: {detektor.mode}")
 
 # ==========================================
 # 3. KONFIGURASI MQTT & LOGIKA
@@ -172,16 +130,127 @@ MQTT_BROKER = "broker.hivemq.com"
 MQTT_TOPIC = "talha/sensor"
 MQTT_CONTROL_TOPIC = "talha/control"
 
-def on_connect(client, userdata, flags, rc):
+# Mode skor:
+#   raw    -> model + fuzzy untuk setiap pesan (perilaku lama)
+#   window -> sensor_now diupdate tiap pesan, skor sekali per WINDOW_SECONDS per device,
+#             atau lebih awal jika ambang safety (ammo_tinggi / bau_menyengat) terlewati
+# WINDOW_EARLY_SCORING=0 mematikan skor dini (skor murni sekali per window).
+# Prediksi ammonia untuk skor dini (model RF, langkah termahal) hanya dijalankan tiap
+# WINDOW_SAFETY_EVERY sampel, pada rata-rata window berjalan; cek ammonia/bau terukur tiap pesan.
+BRIDGE_MODE = os.environ.get('BRIDGE_MODE', 'raw')
+WINDOW_SECONDS = int(os.environ.get('WINDOW_SECONDS', 600))
+WINDOW_EARLY_SCORING = os.environ.get('WINDOW_EARLY_SCORING', '1').lower() not in ('0', 'false', 'off', 'no')
+WINDOW_SAFETY_EVERY = max(int(os.environ.get('WINDOW_SAFETY_EVERY', 10)), 1)
+windows = WindowAggregator(WINDOW_SECONDS)
+device_alarm = {}   # device_id -> hasil safety skor window terakhir
+
+def on_connect(client, userdata, flags, rc, properties=None):
     print(f"✅ Terhubung ke MQTT Broker (Code: {rc})")
-    client.subscribe(MQTT_TOPIC)
-    print("⏳ Menunggu data masuk...")
+    client.subscribe(CLUSTER.topik(MQTT_TOPIC), qos=CLUSTER.qos())
+    print(f"⏳ Menunggu data masuk ({CLUSTER.deskripsi()})...")
 
 def on_message(client, userdata, msg):
-    payload = msg.payload.decode()
+    try:
+        # Format otomatis: JSON (lama) atau biner v1 (lihat sensor_codec.py)
+        readings = decode_payload(msg.payload)
+    except Exception as e:
+        print(f"⚠️ Payload tidak valid: {e}")
+        return
+
+    for data_json in readings:
+        proses_data(data_json)
+
+def prediksi_ammonia(suhu, moisture, ph):
+    input_ammonia = pd.DataFrame([[suhu, moisture, ph]], columns=['Temperature', 'MC(%)', 'pH'])
+    pred_ammonia = model_ammonia.predict(input_ammonia)[0]
+    pred_ammonia = max(0.0, pred_ammonia)
+    return pred_ammonia / 40.0 # Normalisasi
+
+def skor_pembacaan(suhu, moisture, ph, val_bau=0):
+    """Pipeline ML + Fuzzy untuk satu set nilai sensor. Return dict field hasil skor."""
+    # ============================================================
+    # 4. PIPELINE PREDIKSI ML
+    # ============================================================
+    
+    # --- Prediksi AMMONIA ---
+    pred_ammonia = prediksi_ammonia(suhu, moisture, ph)
     
+    print(f"   └── [ML] Ammonia : {pred_ammonia:.2f} ppm")
+
+    # --- Prediksi MATURITY ---
+    pred_maturity = "Unknown"
+    if model_maturity:
+        try:
+            input_maturity = pd.DataFrame([[suhu, moisture, ph, pred_ammonia]], 
+                                          columns=['Temperature', 'MC(%)', 'pH', 'Ammonia(mg/kg)'])
+            maturity_res = model_maturity.predict(input_maturity)[0]
+            pred_maturity = "Matang" if maturity_res == 1 else "Belum Matang"
+            print(f"   └── [ML] Maturity: {pred_maturity}")
+        except Exception:
+            pass
+
+    # ============================================================
+    # 5. PIPELINE FUZZY LOGIC (ENGINE)
+    # ============================================================
+    # Gunakan hasil prediksi ammonia untuk fuzzy
+    mu = hitung_membership(suhu, moisture, ph, pred_ammonia, val_bau)
+    agg = evaluasi_rules(mu, FUZZY_RULES)
+    fuzzy_score = defuzzifikasi(agg)
+    
+    fuzzy_label = label_fuzzy(fuzzy_score)
+
+    print(f"   └── [FZ] Score   : {fuzzy_score:.2f} / 100")
+    print(f"   └── [FZ] Label   : {fuzzy_label}")
+
+    return {
+        'suhu': suhu,
+        'moisture': moisture,
+        'ph': ph,
+        'ammonia': round(pred_ammonia, 2),
+        
+        # Kita simpan dua versi score agar aman
+        'ml_score': 0, # Placeholder jika ML score dipakai
+        'fuzzy_score': round(fuzzy_score, 2),
+        'fuzzy_label': fuzzy_label, 
+        
+        # Field 'score' utama pakai fuzzy (lebih robust)
+        'score': round(fuzzy_score, 2),
+        
+        'maturity': pred_maturity,
+
+        # Status safety (ammonia tinggi / bau menyengat), dipakai skor dini mode window
+        'alarm': bool(max(mu['ammo_tinggi'], mu['bau_menyengat']) > 0),
+    }
+
+def simpan_hasil(device_id, data_to_save, rollup=True):
+    # ============================================================
+    # 6. SIMPAN KE FIREBASE
+    # ============================================================
+    # Riwayat: hanya titik yang lolos kompresi. Realtime & rollup: semua pembacaan.
+    # ROLLUP_FLAG: semua pembacaan bridge sudah masuk rollup
+    # (mode window: nilai mentah per pesan + ammonia/score per window, lihat skor_window)
+    updates = {f"sensor_logs/{buat_push_id(record['timestamp'])}": {**record, ROLLUP_FLAG: True}
+               for record in kompresor.tambah(device_id, data_to_save)}
+    updates['sensor_now'] = data_to_save
+    antrian.tambah(updates)
+
+    # Update rollup inkremental (hanya bucket yang selesai / parsial berkala)
+    if rollup:
+        tambah_rollup(device_id, data_to_save)
+
+def tambah_rollup(device_id, data, count=True):
+    rollup_updates = rollups.tambah(device_id, data, data['timestamp'], count)
+    if rollup_updates:
+        antrian.tambah({f"sensor_rollups/{path}": value for path, value in rollup_updates.items()})
+
+def proses_data(data_json):
+    """Pipeline ML + Fuzzy + simpan untuk satu pembacaan sensor."""
     try:
-        data_json = json.loads(payload)
+        device_id = str(data_json.get('device_id', 'default'))
+
+        # Mode partition: device milik instance lain dilewati
+        if not CLUSTER.milik_instance(device_id):
+            return
         
         # Ambil data sensor
         suhu = float(data_json.get('suhu', 0))
@@ -189,81 +258,124 @@ def on_message(client, userdata, msg):
         ph = float(data_json.get('ph', 7))
         
         # Default value untuk bau (bisa diambil dari sensor jika ada nanti)
-        val_bau = 0 
-        txt_bau = "Tidak Bau"
+        val_bau = float(data_json.get('bau', 0))
+        timestamp = int(data_json.get('timestamp') or time.time() * 1000)
 
         print(f"\n📥 Input: T={suhu}, MC={moisture}, pH={ph}")
 
-        # ============================================================
-        # 4. PIPELINE PREDIKSI ML
-        # ============================================================
-        
-        # --- Prediksi AMMONIA ---
-        input_ammonia = pd.DataFrame([[suhu, moisture, ph]], columns=['Temperature', 'MC(%)', 'pH'])
-        pred_ammonia = model_ammonia.predict(input_ammonia)[0]
-        pred_ammonia = max(0.0, pred_ammonia)
-        pred_ammonia = pred_ammonia / 40.0 # Normalisasi
-        
-        print(f"   └── [ML] Ammonia : {pred_ammonia:.2f} ppm")
-
-        # --- Prediksi MATURITY ---
-        pred_maturity = "Unknown"
-        if model_maturity:
-            try:
-                input_maturity = pd.DataFrame([[suhu, moisture, ph, pred_ammonia]], 
-                                              columns=['Temperature', 'MC(%)', 'pH', 'Ammonia(mg/kg)'])
-                maturity_res = model_maturity.predict(input_maturity)[0]
-                pred_maturity = "Matang" if maturity_res == 1 else "Belum Matang"
-                print(f"   └── [ML] Maturity: {pred_maturity}")
-            except Exception:
-                pass
-
-        # ============================================================
-        # 5. PIPELINE FUZZY LOGIC (ENGINE)
-        # ============================================================
-        # Gunakan hasil prediksi ammonia untuk fuzzy
-        mu = hitung_membership(suhu, moisture, ph, pred_ammonia, val_bau)
-        agg = evaluasi_rules(mu, FUZZY_RULES)
-        fuzzy_score = defuzzifikasi(agg)
-        
-        fuzzy_label = "TIDAK TERDEFINISI"
-        if fuzzy_score <= 45: fuzzy_label = "BURUK"
-        elif fuzzy_score <= 75: fuzzy_label = "CUKUP / SEDANG"
-        elif fuzzy_score <= 92: fuzzy_label = "BAIK"
-        else: fuzzy_label = "SANGAT BAIK"
-
-        print(f"   └── [FZ] Score   : {fuzzy_score:.2f} / 100")
-        print(f"   └── [FZ] Label   : {fuzzy_label}")
-
-        # ============================================================
-        # 6. SIMPAN KE FIREBASE
-        # ============================================================
-        data_to_save = {
-            'suhu': suhu,
-            'moisture': moisture,
-            'ph': ph,
-            'ammonia': round(pred_ammonia, 2),
-            
-            # Kita simpan dua versi score agar aman
-            'ml_score': 0, # Placeholder jika ML score dipakai
-            'fuzzy_score': round(fuzzy_score, 2),
-            'fuzzy_label': fuzzy_label, 
-            
-            # Field 'score' utama pakai fuzzy (lebih robust)
-            'score': round(fuzzy_score, 2),
-            
-            'maturity': pred_maturity,
-            'timestamp': int(time.time() * 1000)
-        }
-
-        ref_logs.push(data_to_save)
-        ref_now.set(data_to_save)
+        # Cek probe rusak (hanya field yang benar-benar dikirim, bukan nilai default)
+        faults = detektor.periksa(device_id, {field: float(data_json[field]) for field in detektor.fields
+                                              if isinstance(data_json.get(field), (int, float))}, timestamp)
+        if faults:
+            print(f"🩺 Data dicurigai rusak ({', '.join(faults)})")
+        # NaN/inf tidak bisa diskor maupun disimpan -> selalu dikarantina (juga di mode flag / off)
+        if not all(map(math.isfinite, (suhu, moisture, ph, val_bau))):
+            karantina(device_id, data_json, faults or ['nonfinite'], timestamp)
+            return
+        if faults and detektor.mode == 'quarantine':
+            karantina(device_id, data_json, faults, timestamp)
+            return
+
+        if BRIDGE_MODE == 'window':
+            proses_window(device_id, data_json, suhu, moisture, ph, val_bau, timestamp, faults)
+            return
+
+        data_to_save = skor_pembacaan(suhu, moisture, ph, val_bau)
+        data_to_save['device_id'] = device_id
+        data_to_save['timestamp'] = timestamp
+        if faults:
+            data_to_save['faults'] = faults
+        simpan_hasil(device_id, data_to_save)
 
         print("💾 Sukses simpan ke Firebase!")
 
     except Exception as e:
         print(f"⚠️ Error memproses data: {e}")
 
+def karantina(device_id, data_json, faults, timestamp):
+    """Simpan pembacaan mencurigakan ke sensor_quarantine; tidak diskor & tidak masuk sensor_now."""
+    record = {field: data_json[field] for field in ('suhu', 'moisture', 'ph', 'bau') if field in data_json}
+    # NaN/inf ditolak Firebase (dan antrian) -> simpan sebagai teks ('nan', 'inf')
+    for field, value in record.items():
+        if isinstance(value, float) and not math.isfinite(value):
+            record[field] = str(value)
+    record.update({'device_id': device_id, 'timestamp': timestamp, 'faults': faults})
+    antrian.tambah({f"sensor_quarantine/{buat_push_id(timestamp)}": record})
+
+def safety_terlewati(device_id, data_json):
+    """
+    Cek apakah window harus diskor lebih awal (tanpa fuzzy & model maturity):
+    - sensor mengirim ammonia / bau terukur yang masuk himpunan ammo_tinggi / bau_menyengat,
+    - skor window terakhir device ini masih dalam kondisi alarm, atau
+    - tiap WINDOW_SAFETY_EVERY sampel: prediksi ammonia dari rata-rata window berjalan
+      (model_ammonia saja) masuk ammo_tinggi.
+    """
+    ammonia = data_json.get('ammonia')
+    if isinstance(ammonia, (int, float)) and trapmf(float(ammonia), [25, 30, 50, 50]) > 0:
+        return True
+    bau = data_json.get('bau')
+    if isinstance(bau, (int, float)) and trapmf(float(bau), [6, 8, 10, 10]) > 0:
+        return True
+    if device_alarm.get(device_id, False):
+        return True
+    # Firmware tidak mengirim ammonia/bau -> pakai prediksi model, tidak tiap pesan
+    avg = windows.rata_rata(device_id)
+    if avg is None or avg['samples'] % WINDOW_SAFETY_EVERY:
+        return False
+    return trapmf(prediksi_ammonia(avg['suhu'], avg['moisture'], avg['ph']), [25, 30, 50, 50]) > 0
+
+def proses_window(device_id, data_json, suhu, moisture, ph, val_bau, timestamp, faults=()):
+    """Mode window: update realtime tiap pesan, skor ML + fuzzy sekali per window."""
+    # Update cepat nilai mentah; field skor dari window terakhir tetap ada
+    raw = {'suhu': suhu, 'moisture': moisture, 'ph': ph, 'device_id': device_id, 'timestamp': timestamp}
+    antrian.tambah({f"sensor_now/{key}": value for key, value in raw.items()})
+    # Rollup: nilai mentah tiap pesan; ammonia/score ditambahkan per window (skor_window)
+    tambah_rollup(device_id, raw)
+
+    # Field bertanda fault tidak ikut rata-rata window (lihat WindowAggregator)
+    avg = windows.tambah(device_id, {'suhu': suhu, 'moisture': moisture, 'ph': ph, 'bau': val_bau}, timestamp, faults)
+    early = avg is None and WINDOW_EARLY_SCORING and safety_terlewati(device_id, data_json)
+    if early:
+        avg = windows.tutup(device_id, timestamp)
+    if avg is None:
+        return
+    skor_window(device_id, avg, early)
+
+def tutup_window_berkala(interval=30):
+    """Thread background: skor window device yang berhenti mengirim (tidak ada pesan penutup)."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            for device_id, avg in windows.tutup_kadaluarsa().items():
+                try:
+                    skor_window(device_id, avg)
+                except Exception as e:
+                    print(f"⚠️ Error skor window {device_id}: {e}")
+
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+    return thread
+
+def skor_window(device_id, avg, early=False):
+    print(f"🧮 Skor window {device_id}: {avg['samples']} sampel" + (" (DINI - safety)" if early else ""))
+    data_to_save = skor_pembacaan(avg['suhu'], avg['moisture'], avg['ph'], avg.get('bau', 0))
+    data_to_save.update({
+        'suhu': round(avg['suhu'], 2),
+        'moisture': round(avg['moisture'], 2),
+        'ph': round(avg['ph'], 2),
+        'samples': avg['samples'],
+        'window_start': avg['window_start'],
+        'device_id': device_id,
+        'timestamp': avg['timestamp'],
+    })
+    if avg.get('faults'):
+        data_to_save['faults'] = avg['faults']
+    device_alarm[device_id] = data_to_save['alarm']
+    simpan_hasil(device_id, data_to_save, rollup=False)
+    # suhu/moisture/ph sudah masuk rollup per pesan; dari window hanya skornya (tidak menambah jumlah sampel)
+    tambah_rollup(device_id, {field: data_to_save[field] for field in ('ammonia', 'score', 'timestamp')}, count=False)
+    print("💾 Sukses simpan skor window ke Firebase!")
+
 # ==========================================
 # 4. LISTENER CONTROL (Actuator Backend)
 # ==========================================
@@ -304,18 +416,51 @@ def control_listener(event):
 # ==========================================
 # 5. MAIN EXECUTION
 # ==========================================
-print("🎧 Mendengarkan perintah Actuator dari Firebase...")
-try:
-    # Memasang listener pada background thread
-    db.reference('controls').listen(control_listener)
-except Exception as e:
-    print(f"⚠️ Gagal memasang listener Firebase: {e}")
+skor_dini = f"aktif, prediksi tiap {WINDOW_SAFETY_EVERY} sampel" if WINDOW_EARLY_SCORING else "nonaktif"
+print(f"⚙️ Mode skor: {BRIDGE_MODE}" + (f" (window {WINDOW_SECONDS} detik, skor dini {skor_dini})"
+                                        if BRIDGE_MODE == 'window' else ""))
+print(f"🧩 Cluster: {CLUSTER.deskripsi()}")
+if CLUSTER.mode == 'shared':
+    print("⚠️ Mode shared membagi pesan satu device ke beberapa instance; "
+          "state window/kompresi/rollup per device tidak konsisten. Gunakan CLUSTER_MODE=partition.")
+pengirim.start()
+if BRIDGE_MODE == 'window':
+    tutup_window_berkala(min(30, WINDOW_SECONDS))
+
+# Tugas tunggal hanya di instance 0 agar tidak dobel di cluster
+if CLUSTER.is_leader:
+    if RAW_RETENTION_DAYS is None:
+        print("🧹 Retensi data mentah: nonaktif (set RAW_RETENTION_DAYS untuk mengaktifkan).")
+    else:
+        print(f"🧹 Retensi data mentah: {RAW_RETENTION_DAYS:g} hari (setelah diagregasi ke rollup).")
+    jalankan_retensi_periodik(ref_logs, ref_rollups, RAW_RETENTION_DAYS)
+
+    print("🎧 Mendengarkan perintah Actuator dari Firebase...")
+    try:
+        # Memasang listener pada background thread
+        db.reference('controls').listen(control_listener)
+    except Exception as e:
+        print(f"⚠️ Gagal memasang listener Firebase: {e}")
 
 # Setup MQTT Client
-client = mqtt.Client()
+client = cluster.buat_client(CLUSTER)
 client.on_connect = on_connect
 client.on_message = on_message
 
 print("Mencoba menghubungkan ke MQTT...")
-client.connect(MQTT_BROKER, 1883, 60)
-client.loop_forever()
\ No newline at end of file
+cluster.connect(client, CLUSTER, MQTT_BROKER, 1883, 60)
+try:
+    client.loop_forever()
+except KeyboardInterrupt:
+    # Skor window yang belum penuh, lalu simpan bucket rollup & titik kompresi yang belum tersimpan
+    for device_id, avg in windows.flush_semua(int(time.time() * 1000)).items():
+        skor_window(device_id, avg)
+    antrian.tambah({f"sensor_rollups/{path}": value for path, value in rollups.flush_semua().items()})
+    antrian.tambah({f"sensor_logs/{buat_push_id(record['timestamp'])}": {**record, ROLLUP_FLAG: True}
+                    for record in kompresor.flush_semua()})
+    print(f"🗜️ Rasio kompresi sensor_logs: {kompresor.rasio():.1f}x")
+    print(f"🩺 {detektor.flagged} dari {detektor.checked} pembacaan dicurigai rusak.")
+    # Kirim sisa antrian; yang gagal tetap di disk untuk dikirim saat start berikutnya
+    pengirim.stop()
+    print(f"📦 {pengirim.sent} item terkirim, {len(antrian)} item tersimpan di antrian disk.")
+    print("\nProgram dihentikan.")
\ No newline at end of file
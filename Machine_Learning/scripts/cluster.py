@@ -0,0 +1,116 @@
+import os
+import zlib
+
+import paho.mqtt.client as mqtt
+
+# ==========================================
+# SCALE-OUT BRIDGE (BEBERAPA INSTANCE)
+# ==========================================
+# CLUSTER_MODE:
+#   off       -> satu instance, subscribe biasa (perilaku lama).
+#   partition -> tiap instance subscribe topic yang sama (QoS 1, sesi persisten) dan hanya
+#                memproses device dengan crc32(device_id) % CLUSTER_SIZE == INSTANCE_ID.
+#                Satu device selalu ditangani instance yang sama & berurutan, jadi state
+#                per device (window, kompresi, rollup) tetap benar. Disarankan.
+#   shared    -> MQTT v5 shared subscription $share/<group>/<topic>: broker membagi pesan
+#                antar instance. Hemat bandwidth, TAPI pesan satu device bisa tersebar ke
+#                beberapa instance -> hanya aman untuk BRIDGE_MODE=raw tanpa state per device.
+#
+# Selain mode off, INSTANCE_ID WAJIB diisi dan unik per instance: dipakai untuk client id MQTT
+# (client id sama = broker saling memutus), leader (instance 0) dan nama file antrian disk.
+#
+# Sesi persisten (clean_start=False + SessionExpiryInterval) + QoS 1: pesan yang datang
+# saat instance restart disimpan broker dan dikirim ulang setelah terhubung kembali.
+
+CLUSTER_MODES = ('off', 'partition', 'shared')
+
+
+class ClusterConfig:
+    def __init__(self, mode='off', instance_id=None, size=1, group='bridge_ml', session_expiry=3600):
+        if mode not in CLUSTER_MODES:
+            raise ValueError(f"CLUSTER_MODE '{mode}' tidak dikenal (pilihan: {', '.join(CLUSTER_MODES)})")
+        if instance_id is None:
+            if mode != 'off':
+                raise ValueError(f"CLUSTER_MODE={mode} butuh INSTANCE_ID yang unik per instance")
+            instance_id = 0
+        if instance_id < 0:
+            raise ValueError(f"INSTANCE_ID {instance_id} tidak boleh negatif")
+        if mode == 'partition' and instance_id >= size:
+            raise ValueError(f"INSTANCE_ID {instance_id} harus di antara 0 dan {size - 1}")
+        self.mode = mode
+        self.instance_id = instance_id
+        self.size = size
+        self.group = group
+        self.session_expiry = session_expiry
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            mode=os.environ.get('CLUSTER_MODE', 'off'),
+            instance_id=int(os.environ['INSTANCE_ID']) if os.environ.get('INSTANCE_ID') else None,
+            size=int(os.environ.get('CLUSTER_SIZE', 1)),
+            group=os.environ.get('CLUSTER_GROUP', 'bridge_ml'),
+            session_expiry=int(os.environ.get('SESSION_EXPIRY', 3600)),
+        )
+
+    @property
+    def is_leader(self):
+        """Instance 0 menjalankan tugas tunggal (listener actuator, retensi data)."""
+        return self.instance_id == 0
+
+    @property
+    def client_id(self):
+        # Client id harus tetap antar restart agar sesi persisten dipakai ulang
+        return f"{self.group}-{self.instance_id}"
+
+    def topik(self, topic):
+        if self.mode == 'shared':
+            return f"$share/{self.group}/{topic}"
+        return topic
+
+    def qos(self):
+        return 0 if self.mode == 'off' else 1
+
+    def milik_instance(self, device_id):
+        if self.mode != 'partition':
+            return True
+        return partisi_device(device_id, self.size) == self.instance_id
+
+    def deskripsi(self):
+        if self.mode == 'off':
+            return "single instance"
+        if self.mode == 'partition':
+            return f"partition {self.instance_id}/{self.size}"
+        return f"shared subscription grup '{self.group}' (instance {self.instance_id})"
+
+
+def partisi_device(device_id, size):
+    """Partisi stabil (sama di semua instance & restart) untuk satu device."""
+    return zlib.crc32(str(device_id).encode('utf-8')) % size
+
+
+def buat_client(config):
+    """
+    Client paho. Mode cluster memakai MQTT v5 + client id tetap untuk sesi persisten.
+    Callback memakai signature API versi 1 (sama seperti bridge_ml.py).
+    """
+    if config.mode == 'off':
+        kwargs = {}
+    else:
+        kwargs = {'client_id': config.client_id, 'protocol': mqtt.MQTTv5}
+    try:
+        # paho-mqtt 2.x wajib menyebut versi callback API
+        return mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, **kwargs)
+    except AttributeError:
+        return mqtt.Client(**kwargs)
+
+
+def connect(client, config, broker, port=1883, keepalive=60):
+    if config.mode == 'off':
+        return client.connect(broker, port, keepalive)
+
+    from paho.mqtt.properties import Properties
+    from paho.mqtt.packettypes import PacketTypes
+    props = Properties(PacketTypes.CONNECT)
+    props.SessionExpiryInterval = config.session_expiry
+    return client.connect(broker, port, keepalive, clean_start=False, properties=props)
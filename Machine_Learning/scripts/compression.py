@@ -0,0 +1,211 @@
+import threading
+
+import numpy as np
+
+# ==========================================
+# KOMPRESI DERET SENSOR (DEADBAND / SWINGING DOOR)
+# ==========================================
+# Hanya titik yang dibutuhkan untuk merekonstruksi deret dalam batas toleransi
+# per field yang disimpan ke sensor_logs (lihat rekonstruksi()).
+# sensor_now & rollup tetap menerima SEMUA pembacaan.
+#
+# - deadband      : simpan jika ada field yang berubah > toleransi dari titik tersimpan terakhir.
+#                   Rekonstruksi sample-and-hold (nilai titik tersimpan terakhir); interpolasi
+#                   linear antar titik deadband bisa meleset sampai 2x toleransi.
+# - swinging_door : simpan titik belok; garis antar titik tersimpan tidak pernah menyimpang
+#                   lebih dari toleransi dari data asli (lebih hemat untuk tren naik/turun).
+#                   Rekonstruksi interpolasi linear.
+# - heartbeat     : paksa simpan jika sudah `heartbeat` detik tanpa titik tersimpan.
+# - force_fields  : field kategori (label, maturity, alarm, faults). Jika berubah, titik
+#                   sebelumnya & titik ini langsung disimpan, jadi transisi tidak hilang.
+
+DEFAULT_TOLERANCES = {'suhu': 0.5, 'moisture': 1.0, 'ph': 0.05, 'ammonia': 0.5, 'score': 2.0}
+DEFAULT_FORCE_FIELDS = ('fuzzy_label', 'maturity', 'alarm', 'faults')
+DEFAULT_HEARTBEAT = 600
+METHODS = ('deadband', 'swinging_door', 'off')
+
+
+class _DeviceState:
+    __slots__ = ('anchor_t', 'anchor', 'last_t', 'last', 'last_record', 'slope_up', 'slope_low', 'kategori')
+
+    def __init__(self, t, values, kategori=()):
+        self.kategori = kategori
+        self.anchor_t = t
+        self.anchor = values
+        self.last_t = None
+        self.last = None
+        self.last_record = None
+        self.slope_up = {}
+        self.slope_low = {}
+
+    def re_anchor(self, t, values):
+        self.anchor_t = t
+        self.anchor = values
+        self.last_t = None
+        self.last = None
+        self.last_record = None
+        self.slope_up = {}
+        self.slope_low = {}
+
+
+class SeriesCompressor:
+    """
+    Kompresor per device. tambah(device_id, record) mengembalikan list record
+    yang perlu disimpan (bisa kosong, 1, atau 2 record).
+    record wajib punya 'timestamp' (ms) dan field numerik sesuai `tolerances`.
+    """
+
+    def __init__(self, tolerances=DEFAULT_TOLERANCES, method='swinging_door', heartbeat=DEFAULT_HEARTBEAT,
+                 force_fields=DEFAULT_FORCE_FIELDS):
+        if method not in METHODS:
+            raise ValueError(f"Metode kompresi '{method}' tidak dikenal (pilihan: {', '.join(METHODS)})")
+        self.tolerances = dict(tolerances)
+        self.force_fields = tuple(force_fields)
+        self.method = method
+        self.heartbeat = heartbeat
+        self.state = {}
+        self.received = 0
+        self.stored = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Dari bagian "compression" di kompos_config.json"""
+        return cls(
+            tolerances=config.get('tolerances', DEFAULT_TOLERANCES),
+            method=config.get('method', 'swinging_door'),
+            heartbeat=config.get('heartbeat_s', DEFAULT_HEARTBEAT),
+            force_fields=config.get('force_fields', DEFAULT_FORCE_FIELDS),
+        )
+
+    def _values(self, record):
+        values = {}
+        for field in self.tolerances:
+            value = record.get(field)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                values[field] = float(value)
+        return values
+
+    def _door_terbuka(self, st, t, values):
+        """
+        Update pintu swinging door dengan titik (t, values).
+        Return True jika garis anchor -> titik ini keluar dari pintu di salah satu field,
+        artinya titik sebelumnya harus disimpan.
+        """
+        dt = t - st.anchor_t
+        violated = False
+        for field, value in values.items():
+            v0 = st.anchor.get(field)
+            if v0 is None:
+                continue
+            tol = self.tolerances[field]
+            if dt <= 0:
+                # Timestamp sama dengan anchor -> cek deadband saja
+                violated = violated or abs(value - v0) > tol
+                continue
+            up = (value - (v0 + tol)) / dt
+            low = (value - (v0 - tol)) / dt
+            st.slope_up[field] = max(st.slope_up.get(field, up), up)
+            st.slope_low[field] = min(st.slope_low.get(field, low), low)
+            # Garis anchor -> titik ini harus tetap di dalam pintu agar semua titik
+            # di antaranya berada dalam toleransi saat titik ini nanti disimpan.
+            slope = (value - v0) / dt
+            if not (st.slope_up[field] <= slope <= st.slope_low[field]):
+                violated = True
+        return violated
+
+    def tambah(self, device_id, record):
+        if self.method == 'off':
+            return [record]
+
+        t = record['timestamp'] / 1000.0
+        values = self._values(record)
+        kategori = tuple(record.get(field) for field in self.force_fields)
+        out = []
+
+        with self.lock:
+            self.received += 1
+            st = self.state.get(device_id)
+
+            if st is None:
+                # Titik pertama device selalu disimpan
+                self.state[device_id] = _DeviceState(t, values, kategori)
+                self.stored += 1
+                return [record]
+
+            if kategori != st.kategori:
+                # Label / status berubah -> simpan titik terakhir kondisi lama & titik ini
+                st.kategori = kategori
+                if st.last_record is not None:
+                    out.append(st.last_record)
+                out.append(record)
+                st.re_anchor(t, values)
+                self.stored += len(out)
+                return out
+
+            if self.method == 'deadband':
+                if any(abs(v - st.anchor.get(f, v)) > self.tolerances[f] for f, v in values.items()):
+                    out.append(record)
+                    st.re_anchor(t, values)
+            elif self._door_terbuka(st, t, values):
+                if st.last is not None:
+                    # Simpan titik sebelumnya, lalu pintu dimulai ulang dari situ
+                    out.append(st.last_record)
+                    st.re_anchor(st.last_t, st.last)
+                    self._door_terbuka(st, t, values)
+                else:
+                    out.append(record)
+                    st.re_anchor(t, values)
+
+            if not out or out[-1] is not record:
+                if t - st.anchor_t >= self.heartbeat:
+                    out.append(record)
+                    st.re_anchor(t, values)
+                else:
+                    st.last_t, st.last, st.last_record = t, values, record
+
+            self.stored += len(out)
+        return out
+
+    def flush_semua(self):
+        """Titik terakhir tiap device yang belum tersimpan (dipanggil saat program berhenti)."""
+        with self.lock:
+            out = []
+            for st in self.state.values():
+                if st.last_record is not None:
+                    out.append(st.last_record)
+                    st.re_anchor(st.last_t, st.last)
+            self.stored += len(out)
+            return out
+
+    def rasio(self):
+        """Rasio kompresi (pembacaan masuk / titik tersimpan)"""
+        return self.received / self.stored if self.stored else 0.0
+
+
+def rekonstruksi(points, timestamps, fields=None, method='swinging_door'):
+    """
+    Rekonstruksi deret dari titik tersimpan: interpolasi linear (swinging_door / off)
+    atau sample-and-hold (deadband), sesuai metode kompresinya.
+    points: list record tersimpan (punya 'timestamp' ms), timestamps: array ms yang diminta.
+    Return dict field -> np.ndarray.
+    """
+    points = sorted(points, key=lambda p: p['timestamp'])
+    timestamps = np.asarray(timestamps, dtype=float)
+    if fields is None:
+        fields = list(DEFAULT_TOLERANCES)
+
+    result = {}
+    for field in fields:
+        xs = [p['timestamp'] for p in points if field in p]
+        ys = [p[field] for p in points if field in p]
+        if not xs:
+            result[field] = np.full(len(timestamps), np.nan)
+            continue
+        if method == 'deadband':
+            # Nilai titik tersimpan terakhir pada/sebelum tiap timestamp
+            idx = np.clip(np.searchsorted(xs, timestamps, side='right') - 1, 0, len(xs) - 1)
+            result[field] = np.asarray(ys, dtype=float)[idx]
+        else:
+            result[field] = np.interp(timestamps, xs, ys)
+    return result
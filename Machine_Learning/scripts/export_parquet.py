@@ -0,0 +1,275 @@
+"""
+Export inkremental sensor_logs ke file kolom (Parquet / Arrow IPC) untuk analisis & training.
+
+Contoh:
+    python export_parquet.py                         # tambahkan data baru sejak export terakhir
+    python export_parquet.py --format arrow          # Arrow IPC: bisa dibaca zero-copy (mmap)
+    python export_parquet.py --reset --out data_export
+
+Struktur output (partisi gaya Hive, per device & per hari UTC):
+    <out>/device_id=esp-01/date=2024-05-01/part-<push id pertama>.parquet
+device_id berasal dari payload MQTT, jadi di-URI-encode di nama folder ('/' -> %2F);
+buka_dataset() men-decode kembali (segment_encoding='uri').
+    <out>/_export_state.json      <- key terakhir yang sudah diexport
+
+Nama kolom mengikuti dataset training (Temperature, MC(%), pH, Ammonia(mg/kg)),
+jadi job training cukup:
+    from export_parquet import baca_kolom
+    df = baca_kolom('data_export').to_pandas()   # hanya 4 kolom, file di-mmap
+
+Setiap run membaca sensor_logs (halaman urut key, lihat backfill.iter_halaman) mulai
+`--overlap-minutes` sebelum key terakhir, dan menulis file part BARU; file lama tidak
+pernah diubah. Key bisa masuk terlambat di bawah key terakhir: titik yang ditahan kompresi
+(heartbeat), isi antrian store-and-forward setelah uplink putus, timestamp dari device.
+Key di jendela overlap yang sudah ada di file export dilewati (dedupe per key), jadi
+overlap harus mencakup keterlambatan terlama (mis. lama uplink putus).
+Nama part = push ID pertama di dalamnya, jadi jika run terputus sebelum checkpoint
+tersimpan, run berikutnya menimpa file yang sama (tidak ada data ganda).
+"""
+import argparse
+import json
+import os
+import time
+from urllib.parse import quote
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow opsional: hanya dibutuhkan untuk export & analisis
+    pa = None
+
+from store_forward import batas_push_id, waktu_push_id
+
+TRAINING_COLUMNS = ['Temperature', 'MC(%)', 'pH', 'Ammonia(mg/kg)']
+
+# field sensor_logs -> (kolom export, tipe)
+KOLOM = [
+    ('suhu', 'Temperature', 'float64'),
+    ('moisture', 'MC(%)', 'float64'),
+    ('ph', 'pH', 'float64'),
+    ('ammonia', 'Ammonia(mg/kg)', 'float64'),
+    ('bau', 'bau', 'float64'),
+    ('fuzzy_score', 'fuzzy_score', 'float64'),
+    ('fuzzy_label', 'fuzzy_label', 'string'),
+    ('maturity', 'maturity', 'string'),
+]
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+STATE_FILE = '_export_state.json'
+DEFAULT_OVERLAP_MINUTES = 24 * 60
+
+
+def _wajib_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow belum terpasang. Jalankan: pip install pyarrow")
+
+
+def _schema():
+    fields = [pa.field('key', pa.string()), pa.field('timestamp', pa.int64())]
+    fields += [pa.field(kolom, pa.float64() if tipe == 'float64' else pa.string()) for _, kolom, tipe in KOLOM]
+    return pa.schema(fields)
+
+
+def _tanggal(timestamp_ms):
+    return time.strftime('%Y-%m-%d', time.gmtime(timestamp_ms / 1000))
+
+
+def _nilai(value, tipe):
+    if tipe == 'float64':
+        return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    return str(value) if value is not None else None
+
+
+class ParquetExporter:
+    """
+    Buffer kolom per (device, hari). tambah() mengumpulkan baris, flush() menulis
+    satu file part per partisi yang berubah lalu mengosongkan buffer.
+    """
+
+    def __init__(self, root, fmt='parquet'):
+        _wajib_pyarrow()
+        if fmt not in FORMATS:
+            raise ValueError(f"Format '{fmt}' tidak dikenal (pilihan: {', '.join(FORMATS)})")
+        self.root = root
+        self.fmt = fmt
+        self.schema = _schema()
+        self.buffers = {}   # (device_id, date) -> {kolom: [nilai, ...]}
+        self.rows = 0
+
+    def tambah(self, key, record):
+        if not isinstance(record, dict):
+            return
+        timestamp = record.get('timestamp')
+        if not isinstance(timestamp, (int, float)):
+            timestamp = waktu_push_id(key)   # data lama tanpa timestamp
+        timestamp = int(timestamp)
+        partisi = (str(record.get('device_id', 'default')), _tanggal(timestamp))
+
+        buf = self.buffers.get(partisi)
+        if buf is None:
+            buf = self.buffers[partisi] = {name: [] for name in self.schema.names}
+        buf['key'].append(key)
+        buf['timestamp'].append(timestamp)
+        for field, kolom, tipe in KOLOM:
+            buf[kolom].append(_nilai(record.get(field), tipe))
+        self.rows += 1
+
+    def flush(self):
+        """Tulis semua buffer. Return jumlah file part yang ditulis."""
+        files = 0
+        for (device_id, date), buf in self.buffers.items():
+            # quote(): device_id dari broker tidak boleh keluar dari root ('../..', '/')
+            directory = os.path.join(self.root, f"device_id={quote(device_id, safe='')}", f"date={date}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{buf['key'][0]}{FORMATS[self.fmt]}")
+            table = pa.Table.from_pydict(buf, schema=self.schema)
+
+            tmp = path + '.tmp'
+            if self.fmt == 'parquet':
+                pq.write_table(table, tmp)
+            else:
+                # Arrow IPC tanpa kompresi -> bisa di-mmap & dibaca zero-copy
+                with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, self.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp, path)
+            files += 1
+        self.buffers.clear()
+        self.rows = 0
+        return files
+
+
+def baca_state(root):
+    try:
+        with open(os.path.join(root, STATE_FILE), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'last_key': None, 'exported': 0}
+
+
+def simpan_state(root, state):
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, STATE_FILE)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def jalankan_export(ref_logs, root, fmt='parquet', page_size=1000, flush_rows=100000,
+                    overlap_minutes=DEFAULT_OVERLAP_MINUTES):
+    """Export sensor_logs baru sejak key terakhir (termasuk key terlambat di jendela overlap). Return state baru."""
+    from backfill import iter_halaman
+
+    exporter = ParquetExporter(root, fmt)
+    state = baca_state(root)
+    start_after, exported_keys = state['last_key'], set()
+    if state['last_key']:
+        print(f"↪️ Melanjutkan setelah key {state['last_key']} ({state['exported']} data sudah diexport).")
+        if overlap_minutes > 0:
+            start_ms = max(waktu_push_id(state['last_key']) - int(overlap_minutes * 60000), 0)
+            start_after = batas_push_id(start_ms)
+            exported_keys = kunci_terexport(root, start_after, _tanggal(max(start_ms - 86400000, 0)))
+
+    t0 = time.time()
+    last_key = state['last_key']
+
+    def checkpoint():
+        pending = exporter.rows
+        files = exporter.flush()
+        state['last_key'] = last_key
+        state['exported'] += pending
+        simpan_state(root, state)
+        print(f"✅ {pending} data -> {files} file, total {state['exported']} (s/d {last_key})")
+
+    for items in iter_halaman(ref_logs, page_size, start_after=start_after):
+        for key, record in items:
+            if key not in exported_keys:
+                exporter.tambah(key, record)
+        last_key = max(last_key or '', items[-1][0])
+        if exporter.rows >= flush_rows:
+            checkpoint()
+    if exporter.rows or last_key != state['last_key']:
+        checkpoint()
+
+    print(f"🏁 Export selesai dalam {time.time() - t0:.1f} detik.")
+    return state
+
+
+def _file_export(root):
+    """(format, daftar file part) di bawah root."""
+    paths = {fmt: [] for fmt in FORMATS}
+    for directory, _, files in os.walk(root):
+        for name in sorted(files):   # file .tmp (run yang terputus) diabaikan
+            for fmt, ext in FORMATS.items():
+                if name.endswith(ext):
+                    paths[fmt].append(os.path.join(directory, name))
+    fmt = 'arrow' if paths['arrow'] and not paths['parquet'] else 'parquet'
+    return fmt, paths[fmt]
+
+
+def buka_dataset(root):
+    """Dataset Arrow atas semua partisi; file dibuka memory-mapped."""
+    _wajib_pyarrow()
+    fmt, paths = _file_export(root)
+    # Tipe partisi eksplisit: device_id numerik ('0042') tetap string, bukan int32
+    partitioning = ds.HivePartitioning(pa.schema([('device_id', pa.string()), ('date', pa.string())]),
+                                       segment_encoding='uri')
+    return ds.dataset(paths, format='ipc' if fmt == 'arrow' else 'parquet',
+                      partitioning=partitioning, partition_base_dir=root,
+                      filesystem=pafs.LocalFileSystem(use_mmap=True))
+
+
+def kunci_terexport(root, start_after, start_date):
+    """Key > start_after yang sudah ada di file export (partisi date >= start_date)."""
+    if not _file_export(root)[1]:
+        return set()
+    table = buka_dataset(root).to_table(
+        columns=['key'], filter=(ds.field('date') >= start_date) & (ds.field('key') > start_after))
+    return set(table.column('key').to_pylist())
+
+
+def baca_kolom(root, columns=TRAINING_COLUMNS, device_id=None, start_date=None, end_date=None):
+    """
+    Baca hanya kolom yang diminta (default: kolom training), opsional filter device
+    & rentang tanggal 'YYYY-MM-DD' (inklusif). Return pyarrow.Table (.to_pandas() untuk DataFrame).
+    """
+    dataset = buka_dataset(root)
+    filters = []
+    if device_id is not None:
+        filters.append(ds.field('device_id') == str(device_id))
+    if start_date is not None:
+        filters.append(ds.field('date') >= start_date)
+    if end_date is not None:
+        filters.append(ds.field('date') <= end_date)
+    expression = None
+    for f in filters:
+        expression = f if expression is None else expression & f
+    return dataset.to_table(columns=list(columns), filter=expression)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export inkremental sensor_logs ke Parquet / Arrow.")
+    parser.add_argument('--out', default='data_export', help="Folder output")
+    parser.add_argument('--format', choices=list(FORMATS), default='parquet')
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--flush-rows', type=int, default=100000, help="Tulis file & checkpoint tiap N data")
+    parser.add_argument('--overlap-minutes', type=float, default=DEFAULT_OVERLAP_MINUTES,
+                        help="Baca ulang N menit sebelum key terakhir untuk key yang masuk terlambat")
+    parser.add_argument('--reset', action='store_true', help="Abaikan state, export dari awal (kosongkan folder --out dulu)")
+    args = parser.parse_args()
+
+    _wajib_pyarrow()
+    if args.reset and os.path.exists(os.path.join(args.out, STATE_FILE)):
+        os.remove(os.path.join(args.out, STATE_FILE))
+
+    import firebase_admin
+    from firebase_admin import credentials, db
+    from backfill import CRED_PATH, DATABASE_URL
+
+    cred = credentials.Certificate(CRED_PATH)
+    firebase_admin.initialize_app(cred, {'databaseURL': DATABASE_URL})
+
+    jalankan_export(db.reference('sensor_logs'), args.out, fmt=args.format,
+                    page_size=args.page_size, flush_rows=args.flush_rows, overlap_minutes=args.overlap_minutes)
@@ -0,0 +1,166 @@
+import math
+import threading
+
+# ==========================================
+# DETEKSI SENSOR RUSAK (STREAMING, PER DEVICE)
+# ==========================================
+# Dijalankan di bridge SEBELUM model & fuzzy, supaya probe rusak tidak menghasilkan
+# skor palsu / memicu actuator. Semua update O(1) per field per pesan; state per
+# device hanya beberapa float (lihat _FieldState) -> ribuan device tetap kecil.
+#
+# Cek per field:
+# - range   : di luar batas fisik (mis. pH < 0 / > 14).
+# - pinned  : menempel di batas skala sensor (mis. moisture 0 atau 100).
+# - stuck   : nilai persis sama `stuck_count` kali berturut-turut (probe macet). Hanya untuk
+#             field yang pernah mengirim nilai pecahan: firmware yang membulatkan ke bilangan
+#             bulat wajar mengirim nilai sama berkali-kali. Default hanya pH (resolusi 0.01).
+# - rate    : berubah lebih dari `max_rate` per menit (+ toleransi noise) dibanding pembacaan sehat terakhir.
+# - spike   : menyimpang > z_max x simpangan baku dari EWMA mean/variance device.
+# Nilai yang dicurigai TIDAK masuk EWMA, agar statistik tidak ikut rusak.
+# Jika `relearn_after` pembacaan berturut-turut dianggap stuck/spike/rate, kemungkinan
+# kondisi kompos memang berubah (atau memang stabil) -> EWMA di-reset ke nilai baru.
+
+DEFAULT_LIMITS = {
+    'suhu': {'min': -10, 'max': 90, 'max_rate': 5.0, 'min_std': 0.5},
+    'moisture': {'min': 0, 'max': 100, 'pinned': [0, 100], 'max_rate': 15.0, 'min_std': 1.0},
+    'ph': {'min': 0, 'max': 14, 'pinned': [0, 14], 'max_rate': 1.0, 'min_std': 0.1, 'stuck_count': 360},
+}
+DEFAULT_ALPHA = 0.05
+DEFAULT_Z_MAX = 6.0
+DEFAULT_WARMUP = 20
+DEFAULT_RELEARN = 10
+MODES = ('quarantine', 'flag', 'off')
+
+
+class _FieldState:
+    __slots__ = ('mean', 'var', 'n', 'last', 'stuck', 'fractional', 'ok', 'ok_t', 'rejects')
+
+    def __init__(self):
+        self.mean = 0.0
+        self.var = 0.0
+        self.n = 0
+        self.last = None    # pembacaan mentah terakhir (untuk cek stuck)
+        self.stuck = 0
+        self.fractional = False   # pernah mengirim nilai bukan bilangan bulat
+        self.ok = None      # pembacaan sehat terakhir (acuan cek rate)
+        self.ok_t = None
+        self.rejects = 0
+
+    def learn(self, value, timestamp_ms, alpha):
+        """Update EWMA mean & variance (incremental, tanpa riwayat)."""
+        self.ok, self.ok_t = value, timestamp_ms
+        if self.n == 0:
+            self.mean, self.var = value, 0.0
+        else:
+            # Selama warmup pakai rata-rata biasa agar cepat konvergen
+            a = max(alpha, 1.0 / (self.n + 1))
+            diff = value - self.mean
+            incr = a * diff
+            self.mean += incr
+            self.var = (1 - a) * (self.var + diff * incr)
+        self.n += 1
+        self.rejects = 0
+
+
+class FaultDetector:
+    """
+    Detektor per device. periksa(device_id, reading, timestamp_ms) mengembalikan
+    list kode fault ("<field>:<jenis>", mis. "ph:stuck"); list kosong = data sehat.
+    Hanya field yang ada di `reading` yang dicek.
+    """
+
+    def __init__(self, limits=DEFAULT_LIMITS, mode='flag', alpha=DEFAULT_ALPHA, z_max=DEFAULT_Z_MAX,
+                 warmup=DEFAULT_WARMUP, relearn_after=DEFAULT_RELEARN):
+        if mode not in MODES:
+            raise ValueError(f"Mode deteksi fault '{mode}' tidak dikenal (pilihan: {', '.join(MODES)})")
+        self.limits = {field: dict(limit) for field, limit in limits.items()}
+        self.fields = list(self.limits)
+        self.mode = mode
+        self.alpha = alpha
+        self.z_max = z_max
+        self.warmup = warmup
+        self.relearn_after = relearn_after
+        self.state = {}   # device_id -> tuple _FieldState (urutan self.fields)
+        self.checked = 0
+        self.flagged = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Dari bagian "fault_detection" di kompos_config.json"""
+        limits = {field: dict(limit) for field, limit in DEFAULT_LIMITS.items()}
+        for field, limit in config.get('limits', {}).items():
+            limits.setdefault(field, {}).update(limit)
+        return cls(
+            limits=limits,
+            mode=config.get('mode', 'flag'),
+            alpha=config.get('alpha', DEFAULT_ALPHA),
+            z_max=config.get('z_max', DEFAULT_Z_MAX),
+            warmup=config.get('warmup', DEFAULT_WARMUP),
+            relearn_after=config.get('relearn_after', DEFAULT_RELEARN),
+        )
+
+    def _cek_field(self, st, limit, value, timestamp_ms):
+        """Return jenis fault (string) atau None. Mengupdate state field."""
+        # Nilai persis sama berturut-turut
+        st.stuck = st.stuck + 1 if value == st.last else 0
+        st.last = value
+
+        if not math.isfinite(value) or value < limit.get('min', -math.inf) or value > limit.get('max', math.inf):
+            return 'range'
+        if value in limit.get('pinned', ()):
+            return 'pinned'
+        st.fractional = st.fractional or not value.is_integer()
+
+        fault = None
+        std = max(math.sqrt(st.var), limit.get('min_std', 0.0))
+        if st.fractional and 'stuck_count' in limit and st.stuck >= limit['stuck_count']:
+            fault = 'stuck'
+        elif st.ok is not None and 'max_rate' in limit and timestamp_ms > st.ok_t:
+            # Batas perubahan = tren maksimum + toleransi noise sensor
+            minutes = (timestamp_ms - st.ok_t) / 60000.0
+            if abs(value - st.ok) > limit['max_rate'] * minutes + self.z_max * std:
+                fault = 'rate'
+        if fault is None and st.n >= self.warmup and abs(value - st.mean) > self.z_max * std:
+            fault = 'spike'
+
+        if fault is None:
+            st.learn(value, timestamp_ms, self.alpha)
+            return None
+        st.rejects += 1
+        if st.rejects >= self.relearn_after:
+            # Perubahan nyata (bukan glitch): mulai belajar ulang dari nilai ini
+            st.n = 0
+            st.stuck = 0
+            st.learn(value, timestamp_ms, self.alpha)
+            return None
+        return fault
+
+    def periksa(self, device_id, reading, timestamp_ms):
+        if self.mode == 'off':
+            return []
+        with self.lock:
+            states = self.state.get(device_id)
+            if states is None:
+                states = self.state[device_id] = tuple(_FieldState() for _ in self.fields)
+
+            faults = []
+            for field, st in zip(self.fields, states):
+                value = reading.get(field)
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    continue
+                fault = self._cek_field(st, self.limits[field], float(value), timestamp_ms)
+                if fault:
+                    faults.append(f"{field}:{fault}")
+
+            self.checked += 1
+            if faults:
+                self.flagged += 1
+            return faults
+
+    def statistik(self, device_id):
+        """Mean & simpangan baku EWMA per field (untuk debugging / dashboard)."""
+        with self.lock:
+            states = self.state.get(device_id, ())
+            return {field: {'mean': st.mean, 'std': math.sqrt(st.var), 'n': st.n}
+                    for field, st in zip(self.fields, states)}
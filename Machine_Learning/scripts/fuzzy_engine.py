@@ -0,0 +1,199 @@
+import numpy as np
+
+# ==========================================
+# FUZZY LOGIC ENGINE
+# Dipakai bersama oleh bridge_ml.py, bench_cluster.py, dst.
+# Rules dibaca dari kompos_config.json oleh pemanggil.
+# ==========================================
+def trapmf(x, params):
+    """Trapezoidal Membership Function"""
+    a, b, c, d = params
+    if x <= a or x >= d: return 0.0
+    if a < x < b: return (x - a) / (b - a)
+    if c < x < d: return (d - x) / (d - c)
+    return 1.0
+
+def trimf(x, params):
+    """Triangular Membership Function"""
+    a, b, c = params
+    if x <= a or x >= c: return 0.0
+    if a < x <= b: return (x - a) / (b - a)
+    if b < x < c: return (c - x) / (c - b)
+    return 0.0
+
+def hitung_membership(suhu, moisture, ph, ammonia, bau_val):
+    """Menghitung derajat keanggotaan (Fuzzification)."""
+    mu = {}
+
+    # --- SUHU ---
+    mu['suhu_dingin'] = trapmf(suhu, [0, 0, 28, 35]) 
+    mu['suhu_ideal']  = trimf(suhu, [30, 45, 55])
+    mu['suhu_panas']  = trapmf(suhu, [50, 60, 80, 80])
+
+    # --- KELEMBAPAN (MOISTURE) ---
+    mu['kelembapan_kering'] = trapmf(moisture, [0, 0, 30, 40])
+    mu['kelembapan_sedang'] = trimf(moisture, [40, 46, 52]) 
+    mu['kelembapan_basah']  = trapmf(moisture, [50, 60, 100, 100])
+
+    # --- PH ---
+    mu['ph_asam']   = trapmf(ph, [0, 0, 5, 6])
+    mu['ph_netral'] = trimf(ph, [5.0, 7.0, 9.0])
+    mu['ph_basa']   = trapmf(ph, [8, 9, 14, 14])
+
+    # --- VARIABEL SAFETY (AMMONIA & BAU) ---
+    mu['ammo_tinggi']   = trapmf(ammonia, [25, 30, 50, 50])
+    mu['bau_menyengat'] = trapmf(bau_val, [6, 8, 10, 10])
+
+    return mu
+
+def evaluasi_rules(mu, rules_json):
+    """Inference Engine berdasarkan JSON"""
+    aggregated = {'buruk': 0.0, 'sedang': 0.0, 'baik': 0.0, 'sangat_baik': 0.0}
+
+    # 1. Safety Override
+    bad_factor = max(mu['ammo_tinggi'], mu['bau_menyengat'])
+    if bad_factor > 0:
+        aggregated['buruk'] = bad_factor
+
+    # 2. Iterasi Rules
+    for rule in rules_json:
+        c_ph = "ph_" + rule['if']['ph'].lower()
+        c_suhu = "suhu_" + rule['if']['suhu'].lower()
+        c_mois = "kelembapan_" + rule['if']['kelembapan'].lower()
+        
+        target = rule['then'].lower().replace(" ", "_")
+
+        val_ph = mu.get(c_ph, 0)
+        val_suhu = mu.get(c_suhu, 0)
+        val_mois = mu.get(c_mois, 0)
+        
+        strength = min(val_ph, val_suhu, val_mois)
+
+        if target in aggregated:
+            aggregated[target] = max(aggregated[target], strength)
+
+    return aggregated
+
+def defuzzifikasi(aggregated):
+    """Menghitung Crisp Output (Score 0-100)"""
+    numerator = 0.0
+    denominator = 0.0
+    
+    for x in range(101):
+        mu_buruk  = trapmf(x, [0, 0, 30, 50])
+        mu_sedang = trimf(x, [40, 60, 80])
+        mu_baik   = trimf(x, [70, 85, 95])
+        mu_sb     = trapmf(x, [90, 95, 100, 100])
+        
+        res_buruk  = min(aggregated['buruk'], mu_buruk)
+        res_sedang = min(aggregated['sedang'], mu_sedang)
+        res_baik   = min(aggregated['baik'], mu_baik)
+        res_sb     = min(aggregated['sangat_baik'], mu_sb)
+        
+        final_mu = max(res_buruk, res_sedang, res_baik, res_sb)
+        
+        numerator += x * final_mu
+        denominator += final_mu
+
+    if denominator == 0: return 0
+    return numerator / denominator
+
+def label_fuzzy(fuzzy_score):
+    """Kategori teks dari score fuzzy 0-100"""
+    if fuzzy_score <= 45: return "BURUK"
+    elif fuzzy_score <= 75: return "CUKUP / SEDANG"
+    elif fuzzy_score <= 92: return "BAIK"
+    else: return "SANGAT BAIK"
+
+
+# ==========================================
+# VERSI VEKTOR (NumPy) - untuk skor banyak data sekaligus
+# ==========================================
+# Hasilnya identik dengan versi skalar di atas, tapi seluruh array diproses
+# sekaligus (dipakai backfill.py untuk skor ulang riwayat sensor_logs).
+
+def trapmf_np(x, params):
+    a, b, c, d = params
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = np.where((x > c) & (x < d), (d - x) / (d - c), 1.0)
+        y = np.where((x > a) & (x < b), (x - a) / (b - a), y)
+    return np.where((x <= a) | (x >= d), 0.0, y)
+
+def trimf_np(x, params):
+    a, b, c = params
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = np.where((x > b) & (x < c), (c - x) / (c - b), 0.0)
+        y = np.where((x > a) & (x <= b), (x - a) / (b - a), y)
+    return np.where((x <= a) | (x >= c), 0.0, y)
+
+def hitung_membership_batch(suhu, moisture, ph, ammonia, bau_val):
+    """Sama seperti hitung_membership, input & output berupa array."""
+    suhu, moisture, ph = (np.asarray(v, dtype=float) for v in (suhu, moisture, ph))
+    ammonia = np.asarray(ammonia, dtype=float)
+    bau_val = np.broadcast_to(np.asarray(bau_val, dtype=float), suhu.shape)
+    return {
+        'suhu_dingin': trapmf_np(suhu, [0, 0, 28, 35]),
+        'suhu_ideal': trimf_np(suhu, [30, 45, 55]),
+        'suhu_panas': trapmf_np(suhu, [50, 60, 80, 80]),
+        'kelembapan_kering': trapmf_np(moisture, [0, 0, 30, 40]),
+        'kelembapan_sedang': trimf_np(moisture, [40, 46, 52]),
+        'kelembapan_basah': trapmf_np(moisture, [50, 60, 100, 100]),
+        'ph_asam': trapmf_np(ph, [0, 0, 5, 6]),
+        'ph_netral': trimf_np(ph, [5.0, 7.0, 9.0]),
+        'ph_basa': trapmf_np(ph, [8, 9, 14, 14]),
+        'ammo_tinggi': trapmf_np(ammonia, [25, 30, 50, 50]),
+        'bau_menyengat': trapmf_np(bau_val, [6, 8, 10, 10]),
+    }
+
+OUTPUT_KELAS = ['buruk', 'sedang', 'baik', 'sangat_baik']
+
+def evaluasi_rules_batch(mu, rules_json):
+    """Return array (n, 4) kekuatan tiap kelas output (urutan OUTPUT_KELAS)."""
+    n = len(mu['ammo_tinggi'])
+    zeros = np.zeros(n)
+    aggregated = {kelas: zeros for kelas in OUTPUT_KELAS}
+
+    # 1. Safety Override
+    aggregated['buruk'] = np.maximum(mu['ammo_tinggi'], mu['bau_menyengat'])
+
+    # 2. Iterasi Rules
+    for rule in rules_json:
+        target = rule['then'].lower().replace(" ", "_")
+        if target not in aggregated:
+            continue
+        strength = np.minimum(np.minimum(
+            mu.get("ph_" + rule['if']['ph'].lower(), zeros),
+            mu.get("suhu_" + rule['if']['suhu'].lower(), zeros)),
+            mu.get("kelembapan_" + rule['if']['kelembapan'].lower(), zeros))
+        aggregated[target] = np.maximum(aggregated[target], strength)
+
+    return np.stack([aggregated[kelas] for kelas in OUTPUT_KELAS], axis=1)
+
+_DEFUZZ_X = np.arange(101, dtype=float)
+_DEFUZZ_MF = np.stack([
+    trapmf_np(_DEFUZZ_X, [0, 0, 30, 50]),
+    trimf_np(_DEFUZZ_X, [40, 60, 80]),
+    trimf_np(_DEFUZZ_X, [70, 85, 95]),
+    trapmf_np(_DEFUZZ_X, [90, 95, 100, 100]),
+])
+
+def defuzzifikasi_batch(aggregated):
+    """Centroid untuk array (n, 4) -> array score (n,)"""
+    final_mu = np.minimum(aggregated[:, :, None], _DEFUZZ_MF[None, :, :]).max(axis=1)
+    numerator = final_mu @ _DEFUZZ_X
+    denominator = final_mu.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator == 0, 0.0, numerator / denominator)
+
+def label_fuzzy_batch(scores):
+    return np.select(
+        [scores <= 45, scores <= 75, scores <= 92],
+        ["BURUK", "CUKUP / SEDANG", "BAIK"],
+        default="SANGAT BAIK",
+    )
+
+def skor_fuzzy_batch(suhu, moisture, ph, ammonia, bau_val, rules_json):
+    """Pipeline fuzzy lengkap untuk banyak data. Return (scores, labels)."""
+    mu = hitung_membership_batch(suhu, moisture, ph, ammonia, bau_val)
+    scores = defuzzifikasi_batch(evaluasi_rules_batch(mu, rules_json))
+    return scores, label_fuzzy_batch(scores)
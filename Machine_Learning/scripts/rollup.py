@@ -0,0 +1,424 @@
+import math
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+# ==========================================
+# ROLLUP MULTI-RESOLUSI UNTUK sensor_logs
+# ==========================================
+# Struktur di Firebase:
+#   sensor_rollups/<tier>/<device_id>/<start_ms> = {
+#       't': start_ms, 'n': jumlah_sampel,
+#       'suhu': {'min': .., 'max': .., 'mean': .., 'n': ..}, 'moisture': {...}, ...
+#   }
+# Key = timestamp awal bucket (ms, 13 digit) -> urut kronologis, jadi dashboard
+# cukup query(ref(db, 'sensor_rollups/1h/<device>'), limitToLast(N)).
+
+# Nama tier -> lebar bucket (detik)
+ROLLUP_TIERS = {'1m': 60, '10m': 600, '1h': 3600, '1d': 86400}
+
+# Field numerik yang diringkas
+ROLLUP_FIELDS = ['suhu', 'moisture', 'ph', 'ammonia', 'score']
+
+# Retensi per tier (hari), None = simpan selamanya
+ROLLUP_RETENTION_DAYS = {'1m': 7, '10m': 90, '1h': 730, '1d': None}
+
+# Field di baris sensor_logs: True = pembacaan ini sudah masuk sensor_rollups.
+# Retensi hanya menghapus baris yang bertanda ini (lihat hapus_log_lama).
+ROLLUP_FLAG = 'rollup'
+
+# Bucket yang masih berjalan ditulis ulang paling cepat tiap N detik,
+# agar titik terbaru (mis. hari ini di tier 1d) tetap tampil di grafik.
+PARTIAL_WRITE_INTERVAL = 60
+
+
+class RollupManager:
+    """
+    Agregasi inkremental min/max/mean per field per device untuk beberapa tier sekaligus.
+    Hanya menyimpan satu bucket terbuka per (tier, device), jadi memori konstan.
+    tambah() mengembalikan dict multi-path update untuk ref('sensor_rollups').update(...).
+
+    loader(path) -> ringkasan tersimpan di '<tier>/<device>/<start_ms>' (atau None).
+    Bucket PERTAMA tiap (tier, device) di proses ini bisa sudah berisi data dari proses
+    sebelumnya (restart, deploy, pindah partisi cluster), jadi digabung dulu dengan ringkasan
+    tersimpan sebelum ditulis. Jika loader gagal (mis. offline), bucket itu ditahan di memori
+    dan dicoba lagi pada tulis parsial berikutnya; tidak pernah ditulis tanpa digabung.
+    """
+
+    def __init__(self, tiers=ROLLUP_TIERS, fields=ROLLUP_FIELDS, partial_interval=PARTIAL_WRITE_INTERVAL,
+                 loader=None):
+        self.tiers = dict(tiers)
+        self.fields = list(fields)
+        self.partial_interval = partial_interval
+        self.loader = loader
+        self.buckets = {}           # (tier, device_id) -> bucket terbuka
+        self.unseeded = {}          # device_id -> [(tier, bucket)] bucket selesai yang belum digabung
+        self.last_partial_write = {} # device_id -> waktu tulis parsial terakhir
+        self.late_readings = 0       # data yang lebih tua dari bucket terbuka (dilewati)
+        self.lock = threading.Lock()
+
+    def _bucket_baru(self, start_ms, seeded=True):
+        return {'start': start_ms, 'count': 0, 'stats': {}, 'base': None, 'seeded': seeded}
+
+    def _ringkas(self, bucket):
+        out = {'t': bucket['start'], 'n': bucket['count']}
+        for field, (vmin, vmax, vsum, n) in bucket['stats'].items():
+            out[field] = {'min': round(vmin, 3), 'max': round(vmax, 3), 'mean': round(vsum / n, 3), 'n': n}
+        return gabung_ringkasan(bucket['base'], out) if bucket['base'] else out
+
+    def _path(self, tier, device_id, bucket):
+        return f"{tier}/{device_id}/{bucket['start']}"
+
+    def _seed(self, tier, device_id, bucket):
+        """Pastikan bucket sudah digabung dengan ringkasan tersimpan. Return False jika loader gagal."""
+        if bucket['seeded']:
+            return True
+        try:
+            stored = self.loader(self._path(tier, device_id, bucket))
+        except Exception as e:
+            print(f"⚠️ Rollup {self._path(tier, device_id, bucket)} belum bisa digabung ({e}), ditunda.")
+            return False
+        bucket['base'] = stored if isinstance(stored, dict) else None
+        bucket['seeded'] = True
+        return True
+
+    def tambah(self, device_id, data, timestamp_ms, count=True):
+        """
+        Masukkan satu pembacaan. Return multi-path update (bisa kosong).
+        count=False: hanya menambah statistik field (mis. skor window), bukan jumlah sampel bucket.
+        """
+        updates = {}
+        with self.lock:
+            for tier, width in self.tiers.items():
+                width_ms = width * 1000
+                start_ms = timestamp_ms - (timestamp_ms % width_ms)
+                key = (tier, device_id)
+                bucket = self.buckets.get(key)
+
+                if bucket is None:
+                    bucket = self.buckets[key] = self._bucket_baru(start_ms, seeded=self.loader is None)
+                elif start_ms > bucket['start']:
+                    # Bucket lama selesai -> tulis final, buka bucket baru
+                    if self._seed(tier, device_id, bucket):
+                        updates[self._path(tier, device_id, bucket)] = self._ringkas(bucket)
+                    else:
+                        self.unseeded.setdefault(device_id, []).append((tier, bucket))
+                    bucket = self.buckets[key] = self._bucket_baru(start_ms)
+                elif start_ms < bucket['start']:
+                    self.late_readings += 1
+                    continue
+
+                if count:
+                    bucket['count'] += 1
+                for field in self.fields:
+                    value = data.get(field)
+                    if not isinstance(value, (int, float)) or isinstance(value, bool):
+                        continue
+                    value = float(value)
+                    stat = bucket['stats'].get(field)
+                    if stat is None:
+                        bucket['stats'][field] = [value, value, value, 1]
+                    else:
+                        stat[0] = min(stat[0], value)
+                        stat[1] = max(stat[1], value)
+                        stat[2] += value
+                        stat[3] += 1
+
+            # Tulis parsial bucket terbuka milik device ini secara berkala
+            now = time.time()
+            if now - self.last_partial_write.get(device_id, 0) >= self.partial_interval:
+                self.last_partial_write[device_id] = now
+                pending = self.unseeded.pop(device_id, [])
+                for tier, bucket in pending:
+                    if self._seed(tier, device_id, bucket):
+                        updates[self._path(tier, device_id, bucket)] = self._ringkas(bucket)
+                    else:
+                        self.unseeded.setdefault(device_id, []).append((tier, bucket))
+                for tier in self.tiers:
+                    bucket = self.buckets.get((tier, device_id))
+                    if bucket is not None and self._seed(tier, device_id, bucket):
+                        updates.setdefault(self._path(tier, device_id, bucket), self._ringkas(bucket))
+
+        return updates
+
+    def flush_semua(self):
+        """Semua bucket terbuka (dipanggil saat program berhenti). Bucket yang gagal digabung dilewati."""
+        with self.lock:
+            buckets = [(tier, device_id, bucket) for (tier, device_id), bucket in self.buckets.items()]
+            buckets += [(tier, device_id, bucket) for device_id, pending in self.unseeded.items()
+                        for tier, bucket in pending]
+            return {self._path(tier, device_id, bucket): self._ringkas(bucket)
+                    for tier, device_id, bucket in buckets if self._seed(tier, device_id, bucket)}
+
+
+def gabung_ringkasan(a, b):
+    """Gabung dua ringkasan untuk bucket yang sama (min/max/mean berbobot jumlah sampel)."""
+    if not a:
+        return b
+    out = {'t': a['t'], 'n': a.get('n', 0) + b.get('n', 0)}
+    for field in (set(a) | set(b)) - {'t', 'n'}:
+        sa, sb = a.get(field), b.get(field)
+        if not isinstance(sa, dict) or not isinstance(sb, dict):
+            out[field] = sa if isinstance(sa, dict) else sb
+            continue
+        # Ringkasan lama belum punya 'n' per field -> pakai 'n' bucket
+        na, nb = sa.get('n', a.get('n', 0)), sb.get('n', b.get('n', 0))
+        out[field] = {
+            'min': min(sa['min'], sb['min']),
+            'max': max(sa['max'], sb['max']),
+            'mean': round((sa['mean'] * na + sb['mean'] * nb) / max(na + nb, 1), 3),
+            'n': na + nb,
+        }
+    return out
+
+
+# ==========================================
+# RETENSI DATA
+# ==========================================
+# Catatan: tambahkan index di Firebase Rules agar query timestamp efisien:
+#   "sensor_logs": { ".indexOn": ["timestamp"] }
+#
+# Data mentah TIDAK dihapus kecuali RAW_RETENTION_DAYS diset. Sebelum menghapus,
+# baris yang belum pernah diagregasi (riwayat lama, data Project.py / python.py)
+# dimasukkan dulu ke rollup oleh rollup_log_lama(), jadi tidak ada data yang hilang
+# dari grafik riwayat panjang.
+
+def _halaman_lama(ref_logs, cutoff, batch_size, start=0):
+    """Halaman baris sensor_logs dengan start <= timestamp <= cutoff, urut timestamp."""
+    while True:
+        page = ref_logs.order_by_child('timestamp').start_at(start).end_at(cutoff).limit_to_first(batch_size).get()
+        if not page:
+            return
+        yield page
+        if len(page) < batch_size:
+            return
+        last = max((row['timestamp'] for row in page.values() if isinstance(row, dict)), default=start)
+        # start_at inklusif; baris yang sudah diproses di halaman ini dilewati pemanggil
+        start = last if last > start else last + 1
+
+def rollup_log_lama(ref_logs, ref_rollups, cutoff_ms, tiers=ROLLUP_TIERS,
+                    retention=ROLLUP_RETENTION_DAYS, batch_size=500):
+    """
+    Backfill rollup untuk baris sensor_logs (timestamp <= cutoff_ms) yang belum bertanda ROLLUP_FLAG.
+    Bucket digabung dengan bucket yang sudah ada, lalu baris ditandai, dalam SATU multi-path
+    update per halaman (atomik: jika terputus, tidak ada sampel yang terhitung dua kali).
+    cutoff_ms harus lebih tua dari bucket yang masih terbuka di bridge (minimal 1 hari).
+    Return jumlah baris yang diagregasi.
+    """
+    root = ref_logs.parent
+    now_ms = int(time.time() * 1000)
+    total = 0
+    for page in _halaman_lama(ref_logs, cutoff_ms, batch_size):
+        rows = sorted(((key, row) for key, row in page.items()
+                       if isinstance(row, dict) and not row.get(ROLLUP_FLAG)
+                       and isinstance(row.get('timestamp'), (int, float))),
+                      key=lambda item: item[1]['timestamp'])
+        if not rows:
+            continue
+
+        manager = RollupManager(tiers, partial_interval=float('inf'))
+        buckets = {}
+        for _, row in rows:
+            device_id = str(row.get('device_id', 'default'))
+            buckets.update(manager.tambah(device_id, row, int(row['timestamp'])))
+        buckets.update(manager.flush_semua())
+
+        updates = {}
+        for path, summary in buckets.items():
+            tier = path.split('/', 1)[0]
+            days = retention.get(tier)
+            if days is not None and summary['t'] < now_ms - days * 86400 * 1000:
+                continue   # akan langsung dihapus retensi tier ini
+            existing = ref_rollups.child(path).get()
+            updates[f"{ref_rollups.key}/{path}"] = gabung_ringkasan(existing, summary)
+        for key, _ in rows:
+            updates[f"{ref_logs.key}/{key}/{ROLLUP_FLAG}"] = True
+        root.update(updates)
+        total += len(rows)
+    return total
+
+
+def _nilai_deret(xs, ys, t, method):
+    """Nilai deret rekonstruksi di t (sama dengan compression.rekonstruksi, tanpa numpy)."""
+    k = bisect_right(xs, t)
+    if k == 0:
+        return ys[0]
+    if method == 'deadband' or k == len(xs):
+        return ys[k - 1]
+    x0, x1 = xs[k - 1], xs[k]
+    return ys[k - 1] + (ys[k] - ys[k - 1]) * (t - x0) / (x1 - x0)
+
+def statistik_deret(xs, ys, start_ms, end_ms, method='swinging_door'):
+    """
+    (min, max, mean) deret rekonstruksi titik tersimpan (xs urut, ms) di [start_ms, end_ms):
+    interpolasi linear (swinging_door / off) atau sample-and-hold (deadband), mean berbobot waktu.
+    Return None jika rentang tidak tertutup titik sama sekali.
+    """
+    if not xs or end_ms <= xs[0] or (method != 'deadband' and start_ms > xs[-1]):
+        return None
+    lo = max(start_ms, xs[0])
+    hi = end_ms if method == 'deadband' else min(end_ms, xs[-1])
+    knots = [lo] + xs[bisect_right(xs, lo):bisect_left(xs, hi)] + [hi]
+    values = [_nilai_deret(xs, ys, t, method) for t in knots]
+    if hi <= lo:
+        return values[0], values[0], values[0]
+    if method == 'deadband':
+        area = sum(v * (t1 - t0) for v, t0, t1 in zip(values, knots, knots[1:]))
+    else:
+        area = sum((v0 + v1) / 2 * (t1 - t0) for v0, v1, t0, t1 in zip(values, values[1:], knots, knots[1:]))
+    if hi == end_ms:
+        values = values[:-1]   # nilai tepat di end_ms milik bucket berikutnya
+    return min(values), max(values), area / (hi - lo)
+
+def bangun_ulang_rollup(ref_logs, ref_rollups, start_ms, end_ms, tiers=ROLLUP_TIERS, batch_size=500,
+                        fields=('ammonia', 'score'), method='swinging_door'):
+    """
+    Hitung ulang statistik `fields` di bucket rollup [start_ms, end_ms) dari baris sensor_logs
+    bertanda ROLLUP_FLAG, mis. setelah backfill.py mengganti ammonia/score. start_ms & end_ms
+    harus kelipatan bucket terbesar (1 hari) dan bucket itu sudah ditutup bridge.
+    Hanya field di `fields` yang ditimpa; field lain dan 'n' bucket tidak disentuh.
+
+    Per field per bucket:
+    - jumlah baris == n field tersimpan (tanpa kompresi, atau skor window): dihitung persis.
+    - selain itu sensor_logs hanya berisi titik hasil kompresi (`method` = metode kompresi
+      bridge) atau sebagian sudah dihapus retensi: min/max/mean dihitung dari rekonstruksi
+      deret di rentang bucket (statistik_deret), n tetap. Hasilnya perkiraan, dalam batas
+      toleransi kompresi.
+    Return (jumlah field-bucket tepat, jumlah perkiraan, jumlah dilewati).
+    """
+    seen = set()   # halaman bisa tumpang tindih di timestamp batas
+    rows = []
+    for page in _halaman_lama(ref_logs, end_ms - 1, batch_size, start=start_ms):
+        for key, row in page.items():
+            if key not in seen and isinstance(row, dict) and row.get(ROLLUP_FLAG) \
+                    and isinstance(row.get('timestamp'), (int, float)):
+                seen.add(key)
+                rows.append(row)
+    if not rows:
+        return 0, 0, 0
+    rows.sort(key=lambda row: row['timestamp'])
+
+    manager = RollupManager(tiers, fields, partial_interval=float('inf'))
+    buckets = {}
+    series = {}    # (device_id, field) -> (xs, ys)
+    for row in rows:
+        device_id = str(row.get('device_id', 'default'))
+        buckets.update(manager.tambah(device_id, row, int(row['timestamp'])))
+        for field in fields:
+            value = row.get(field)
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+                xs, ys = series.setdefault((device_id, field), ([], []))
+                xs.append(int(row['timestamp']))
+                ys.append(float(value))
+    buckets.update(manager.flush_semua())
+
+    updates, exact, approx, skipped = {}, 0, 0, 0
+    for tier, width in tiers.items():
+        for device_id in {device_id for device_id, _ in series}:
+            ref_device = ref_rollups.child(f"{tier}/{device_id}")
+            existing = ref_device.order_by_key().start_at(str(start_ms)).end_at(str(end_ms - 1)).get() or {}
+            for start, old in existing.items():
+                path = f"{tier}/{device_id}/{start}"
+                summary = buckets.get(path) or {}
+                for field in fields:
+                    old_stat = old.get(field) if isinstance(old, dict) else None
+                    if not isinstance(old_stat, dict):
+                        continue
+                    new_stat = summary.get(field)
+                    if new_stat is not None and new_stat['n'] == old_stat.get('n'):
+                        updates[f"{path}/{field}"] = new_stat
+                        exact += 1
+                        continue
+                    stats = None
+                    if (device_id, field) in series:
+                        xs, ys = series[(device_id, field)]
+                        stats = statistik_deret(xs, ys, int(start), int(start) + width * 1000, method)
+                    if stats is None:
+                        skipped += 1
+                        continue
+                    vmin, vmax, mean = stats
+                    updates[f"{path}/{field}"] = {'min': round(vmin, 3), 'max': round(vmax, 3),
+                                                  'mean': round(mean, 3), 'n': old_stat.get('n')}
+                    approx += 1
+    if updates:
+        ref_rollups.update(updates)
+    return exact, approx, skipped
+
+def hapus_log_lama(ref_logs, retention_days, batch_size=500):
+    """
+    Hapus data mentah sensor_logs yang lebih tua dari retention_days DAN sudah
+    masuk rollup (bertanda ROLLUP_FLAG). Return jumlah terhapus.
+    """
+    cutoff = int((time.time() - retention_days * 86400) * 1000)
+    total = 0
+    for page in _halaman_lama(ref_logs, cutoff, batch_size):
+        old = [key for key, row in page.items() if isinstance(row, dict) and row.get(ROLLUP_FLAG)]
+        if old:
+            ref_logs.update({key: None for key in old})
+            total += len(old)
+    return total
+def hapus_rollup_lama(ref_rollups, retention=ROLLUP_RETENTION_DAYS, batch_size=500):
+    """Hapus bucket rollup yang melewati retensi tiap tier. Return jumlah terhapus."""
+    total = 0
+    for tier, days in retention.items():
+        if days is None:
+            continue
+        cutoff_key = str(int((time.time() - days * 86400) * 1000))
+        devices = ref_rollups.child(tier).get(shallow=True) or {}
+        for device_id in devices:
+            ref_device = ref_rollups.child(f"{tier}/{device_id}")
+            while True:
+                old = ref_device.order_by_key().end_at(cutoff_key).limit_to_first(batch_size).get()
+                if not old:
+                    break
+                ref_device.update({key: None for key in old})
+                total += len(old)
+                if len(old) < batch_size:
+                    break
+    return total
+
+def jalankan_retensi_periodik(ref_logs, ref_rollups, raw_retention_days=None, interval=3600):
+    """
+    Thread background tiap `interval` detik: pruning bucket rollup per tier, dan
+    (hanya jika raw_retention_days diset) backfill rollup + pruning data mentah.
+    """
+    def loop():
+        while True:
+            try:
+                n_raw = 0
+                if raw_retention_days is not None:
+                    cutoff = int((time.time() - raw_retention_days * 86400) * 1000)
+                    n_backfill = rollup_log_lama(ref_logs, ref_rollups, cutoff)
+                    if n_backfill:
+                        print(f"🧮 Rollup backfill: {n_backfill} log mentah lama diagregasi.")
+                    n_raw = hapus_log_lama(ref_logs, raw_retention_days)
+                n_rollup = hapus_rollup_lama(ref_rollups)
+                if n_raw or n_rollup:
+                    print(f"🧹 Retensi: {n_raw} log mentah & {n_rollup} bucket rollup dihapus.")
+            except Exception as e:
+                print(f"⚠️ Error retensi data: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    # Backfill rollup satu kali untuk riwayat lama (tanpa menghapus apa pun):
+    #   python rollup.py --days 1
+    import argparse
+    import firebase_admin
+    from firebase_admin import credentials, db
+    from backfill import CRED_PATH, DATABASE_URL
+
+    parser = argparse.ArgumentParser(description="Backfill sensor_rollups dari sensor_logs yang belum diagregasi.")
+    parser.add_argument('--days', type=float, default=1,
+                        help="Hanya data lebih tua dari N hari (bucket yang masih terbuka di bridge tidak disentuh)")
+    args = parser.parse_args()
+
+    cred = credentials.Certificate(CRED_PATH)
+    firebase_admin.initialize_app(cred, {'databaseURL': DATABASE_URL})
+    cutoff = int((time.time() - max(args.days, 1) * 86400) * 1000)
+    n = rollup_log_lama(db.reference('sensor_logs'), db.reference('sensor_rollups'), cutoff)
+    print(f"🧮 {n} log mentah diagregasi ke sensor_rollups.")
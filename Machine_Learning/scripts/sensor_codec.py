@@ -0,0 +1,122 @@
+import json
+import struct
+
+import numpy as np
+
+# ==========================================
+# FORMAT PAYLOAD BINER SENSOR (v1)
+# ==========================================
+# Alternatif ringkas dari JSON {"suhu": .., "moisture": .., "ph": ..}.
+# Semua little-endian, tanpa padding (sama dengan struct packed di ESP32).
+#
+#   Header (6 byte) : magic 'KP' | versi u8 | flags u8 (0) | jumlah record u16
+#   Record (20 byte): device_id u32 | timestamp u32 (detik UNIX, 0 = pakai waktu bridge)
+#                     | suhu f32 | moisture f32 | ph f32
+#
+# Satu pesan bisa berisi 1 record (kirim biasa) atau banyak record (batch).
+# JSON 34-40 byte per pembacaan -> 26 byte (1 record) atau ~20 byte/record (batch).
+# Keuntungan utama: ukuran pesan & parsing tanpa JSON. Bridge tetap mengolah
+# pembacaan satu per satu (dict), jadi decode_array() zero-copy hanya berguna
+# untuk konsumen batch yang membaca per kolom.
+# Firmware mengirim 1 record per pesan: untuk pesan kecil (<= SMALL_BATCH record)
+# decode_payload() memakai struct biasa, karena overhead NumPy lebih besar dari
+# datanya. NumPy hanya dipakai untuk batch besar (lihat bench_codec.py).
+
+MAGIC = b'KP'
+VERSION = 1
+
+HEADER = struct.Struct('<2sBBH')
+RECORD = struct.Struct('<IIfff')
+SMALL_BATCH = 8
+
+RECORD_DTYPE = np.dtype([
+    ('device_id', '<u4'),
+    ('timestamp', '<u4'),
+    ('suhu', '<f4'),
+    ('moisture', '<f4'),
+    ('ph', '<f4'),
+])
+
+class PayloadError(ValueError):
+    """Payload biner rusak / versi tidak dikenal."""
+
+def is_binary(payload):
+    return payload[:2] == MAGIC
+
+def _jumlah_record(payload):
+    """Validasi header & panjang payload. Return jumlah record."""
+    if len(payload) < HEADER.size:
+        raise PayloadError(f"Payload terlalu pendek ({len(payload)} byte)")
+    magic, version, flags, count = HEADER.unpack_from(payload)
+    if magic != MAGIC:
+        raise PayloadError("Magic bytes tidak cocok")
+    if version != VERSION:
+        raise PayloadError(f"Versi payload {version} tidak didukung")
+    expected = HEADER.size + count * RECORD.size
+    if len(payload) != expected:
+        raise PayloadError(f"Panjang payload {len(payload)} byte, seharusnya {expected}")
+    return count
+
+def decode_array(payload):
+    """
+    Decode payload biner ke NumPy structured array TANPA menyalin data
+    (np.frombuffer = view read-only di atas bytes payload). Untuk konsumen batch
+    yang bekerja per kolom (mis. arr['suhu'].mean()); bridge tetap memproses
+    per pembacaan lewat decode_payload().
+    """
+    count = _jumlah_record(payload)
+    return np.frombuffer(payload, dtype=RECORD_DTYPE, count=count, offset=HEADER.size)
+
+def decode_records(payload):
+    """Decode payload biner kecil dengan struct (tanpa NumPy). Hasil sama dengan array_to_records."""
+    records = []
+    for device_id, timestamp, suhu, moisture, ph in RECORD.iter_unpack(memoryview(payload)[HEADER.size:]):
+        record = {'device_id': str(device_id), 'suhu': round(suhu, 3), 'moisture': round(moisture, 3),
+                  'ph': round(ph, 3)}
+        if timestamp:
+            record['timestamp'] = timestamp * 1000
+        records.append(record)
+    return records
+
+def array_to_records(arr):
+    """
+    Structured array -> list of dict (format yang sama dengan hasil json.loads).
+    Konversi kolom dilakukan sekaligus per kolom, lalu satu dict per record.
+    """
+    # Float32 -> dibulatkan agar tidak muncul 32.099998 di database
+    suhu, moisture, ph = (np.round(arr[field].astype(np.float64), 3).tolist() for field in ('suhu', 'moisture', 'ph'))
+    # Detik -> milidetik (satuan timestamp di sensor_logs)
+    timestamps = (arr['timestamp'].astype(np.int64) * 1000).tolist()
+    records = []
+    for i, device_id in enumerate(arr['device_id'].tolist()):
+        record = {'device_id': str(device_id), 'suhu': suhu[i], 'moisture': moisture[i], 'ph': ph[i]}
+        if timestamps[i]:
+            record['timestamp'] = timestamps[i]
+        records.append(record)
+    return records
+
+def decode_payload(payload):
+    """
+    Auto-detect format (biner v1 atau JSON) dan kembalikan list pembacaan (dict).
+    JSON boleh berupa satu objek atau list objek.
+    """
+    if is_binary(payload):
+        if _jumlah_record(payload) <= SMALL_BATCH:
+            return decode_records(payload)
+        return array_to_records(decode_array(payload))
+
+    data = json.loads(payload.decode('utf-8') if isinstance(payload, (bytes, bytearray)) else payload)
+    if isinstance(data, list):
+        return data
+    return [data]
+
+def encode_readings(readings):
+    """
+    Encode list dict pembacaan ke payload biner v1 (untuk simulator / gateway).
+    Field yang tidak ada diisi 0.
+    """
+    arr = np.zeros(len(readings), dtype=RECORD_DTYPE)
+    for i, reading in enumerate(readings):
+        for field in RECORD_DTYPE.names:
+            arr[i][field] = reading.get(field, 0)
+    return HEADER.pack(MAGIC, VERSION, 0, len(readings)) + arr.tobytes()
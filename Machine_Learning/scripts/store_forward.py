@@ -0,0 +1,426 @@
+import json
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: tanpa kunci file
+    fcntl = None
+
+# ==========================================
+# STORE-AND-FORWARD: ANTRIAN DISK (MMAP)
+# ==========================================
+# Semua tulisan ke Firebase lewat sini:
+#   bridge -> DiskQueue.tambah(updates)  (lokal, mikrodetik)
+#          -> thread StoreForward        (kirim batch multi-path update saat backend bisa dihubungi)
+#
+# File <path>.log: ring buffer berukuran tetap (size cap), di-mmap.
+#   Record: panjang u32 | crc32 u32 | seq u64 | payload JSON
+#   Jika record tidak muat di ujung file, ditulis WRAP marker lalu lanjut dari offset 0.
+#   Nomor seq naik terus, jadi data lama yang tertimpa tidak mungkin terbaca ulang.
+# File <path>.log dikunci eksklusif (flock) selama antrian terbuka: dua proses dengan
+# path antrian yang sama akan saling menimpa, jadi proses kedua langsung gagal.
+# File <path>.ckpt: offset & seq record berikutnya yang belum terkirim (checkpoint).
+#   Setelah restart, antrian di-scan dari checkpoint untuk mencari ujung tulis.
+#
+# Jika antrian penuh (uplink mati lama), record TERLAMA dibuang agar data terbaru tetap masuk.
+#
+# Error kirim dibedakan:
+#   sementara (jaringan, server)   -> batch dicoba ulang dengan backoff.
+#   permanen (data / path ditolak) -> batch dibelah dua sampai item penyebabnya ketemu,
+#                                     item itu dipindah ke <path>.dead (JSON lines), sisanya terkirim.
+
+RECORD_HEADER = struct.Struct('<IIQ')
+WRAP_MARKER = 0xFFFFFFFF
+DEFAULT_CAPACITY = 64 * 1024 * 1024
+
+
+class DiskQueue:
+    def __init__(self, path, capacity=DEFAULT_CAPACITY):
+        self.log_path = path + '.log'
+        self.ckpt_path = path + '.ckpt'
+        self.dead_path = path + '.dead'
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.dropped = 0
+
+        directory = os.path.dirname(os.path.abspath(self.log_path))
+        os.makedirs(directory, exist_ok=True)
+
+        # Buka / buat file dengan ukuran tetap. fd tetap terbuka untuk menahan kunci.
+        self.fd = os.open(self.log_path, os.O_RDWR | os.O_CREAT)
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    raise RuntimeError(f"Antrian {self.log_path} sedang dipakai proses lain "
+                                       f"(INSTANCE_ID / QUEUE_PATH harus unik per instance)") from None
+            if os.fstat(self.fd).st_size != capacity:
+                os.ftruncate(self.fd, capacity)
+            self.mm = mmap.mmap(self.fd, capacity)
+        except BaseException:
+            os.close(self.fd)
+            raise
+
+        self.read_off, self.read_seq = self._baca_checkpoint()
+        self._recover()
+
+    # ------------------------------------------
+    # Checkpoint & recovery
+    # ------------------------------------------
+    def _baca_checkpoint(self):
+        try:
+            with open(self.ckpt_path, 'r') as f:
+                ckpt = json.load(f)
+            self.dropped = ckpt.get('dropped', 0)
+            if 0 <= ckpt['read_off'] < self.capacity:
+                return ckpt['read_off'], ckpt['read_seq']
+        except (OSError, ValueError, KeyError):
+            pass
+        return 0, 0
+
+    def _simpan_checkpoint(self):
+        tmp = self.ckpt_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'read_off': self.read_off, 'read_seq': self.read_seq, 'dropped': self.dropped}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.ckpt_path)
+
+    def _header(self, off):
+        if off + RECORD_HEADER.size > self.capacity:
+            return None
+        return RECORD_HEADER.unpack_from(self.mm, off)
+
+    def _next(self, off, seq):
+        """
+        Record valid dengan nomor `seq` di posisi `off` (mengikuti WRAP marker).
+        Return (payload_off, panjang, offset_setelahnya, wrapped) atau None.
+        """
+        wrapped = False
+        header = self._header(off)
+        if header and header[0] == WRAP_MARKER and header[2] == seq:
+            off, wrapped = 0, True
+            header = self._header(0)
+        if not header:
+            return None
+        length, crc, rec_seq = header
+        start = off + RECORD_HEADER.size
+        # length 0 = area kosong (file baru berisi nol), bukan record
+        if rec_seq != seq or length == 0 or length == WRAP_MARKER or start + length > self.capacity:
+            return None
+        if zlib.crc32(self.mm[start:start + length], seq & 0xFFFFFFFF) != crc:
+            return None
+        return start, length, start + length, wrapped
+
+    def _recover(self):
+        off, seq, wrapped = self.read_off, self.read_seq, False
+        while True:
+            rec = self._next(off, seq)
+            if rec is None:
+                break
+            _, _, off, crossed = rec
+            wrapped = wrapped or crossed
+            seq += 1
+        self.write_off, self.write_seq = off, seq
+        self.wrapped = wrapped
+
+    # ------------------------------------------
+    # Tulis
+    # ------------------------------------------
+    def __len__(self):
+        return self.write_seq - self.read_seq
+
+    def _tulis_di(self, off, payload):
+        seq = self.write_seq
+        crc = zlib.crc32(payload, seq & 0xFFFFFFFF)
+        RECORD_HEADER.pack_into(self.mm, off, len(payload), crc, seq)
+        start = off + RECORD_HEADER.size
+        self.mm[start:start + len(payload)] = payload
+        self.write_off = start + len(payload)
+        self.write_seq += 1
+
+    def _coba_tulis(self, payload):
+        need = RECORD_HEADER.size + len(payload)
+        if not self.wrapped:
+            # Sisakan ruang satu header di ujung untuk WRAP marker
+            if self.write_off + need + RECORD_HEADER.size <= self.capacity:
+                self._tulis_di(self.write_off, payload)
+                return True
+            if need < self.read_off:
+                RECORD_HEADER.pack_into(self.mm, self.write_off, WRAP_MARKER, 0, self.write_seq)
+                self.wrapped = True
+                self._tulis_di(0, payload)
+                return True
+            return False
+        if self.write_off + need < self.read_off:
+            self._tulis_di(self.write_off, payload)
+            return True
+        return False
+
+    def _buang_terlama(self):
+        rec = self._next(self.read_off, self.read_seq)
+        if rec is None:
+            return False
+        _, _, next_off, crossed = rec
+        self._maju(next_off, self.read_seq + 1, crossed)
+        self.dropped += 1
+        return True
+
+    def tambah(self, item):
+        """Simpan satu item (dict yang bisa di-JSON) ke antrian. NaN/inf ditolak (ValueError)."""
+        payload = json.dumps(item, separators=(',', ':'), allow_nan=False).encode('utf-8')
+        if RECORD_HEADER.size * 3 + len(payload) > self.capacity // 2:
+            raise ValueError(f"Item terlalu besar untuk antrian ({len(payload)} byte)")
+
+        with self.lock:
+            dropped_before = self.dropped
+            while not self._coba_tulis(payload):
+                if not self._buang_terlama():
+                    raise RuntimeError("Antrian rusak: tidak bisa membuang record terlama")
+            if self.dropped != dropped_before:
+                self._simpan_checkpoint()
+
+    # ------------------------------------------
+    # Baca & ack
+    # ------------------------------------------
+    def baca(self, max_items=500):
+        """
+        Ambil sampai max_items item terdepan TANPA menghapusnya.
+        Return (items, token); panggil ack(token) setelah item berhasil dikirim.
+        token = seq record setelah item terakhir.
+        """
+        with self.lock:
+            items = []
+            off, seq = self.read_off, self.read_seq
+            while len(items) < max_items and seq < self.write_seq:
+                rec = self._next(off, seq)
+                if rec is None:
+                    break
+                start, length, off, _ = rec
+                items.append(json.loads(bytes(self.mm[start:start + length])))
+                seq += 1
+            return items, seq
+
+    def _maju(self, off, seq, crossed_wrap):
+        self.read_off, self.read_seq = off, seq
+        if crossed_wrap:
+            self.wrapped = False
+        if self.read_seq == self.write_seq:
+            # Antrian kosong -> mulai lagi dari awal file
+            self.read_off = self.write_off = 0
+            self.wrapped = False
+
+    def ack(self, token):
+        seq = token
+        with self.lock:
+            # Record yang sudah ack bisa jadi sudah dibuang (antrian penuh) saat pengiriman
+            if seq <= self.read_seq:
+                return
+            # Offset & lewat-WRAP dihitung ulang dari posisi baca SEKARANG, bukan saat baca():
+            # selama pengiriman, record terlama bisa dibuang melewati WRAP dan penulis bisa
+            # sudah WRAP lagi, jadi kondisi saat baca() sudah tidak berlaku.
+            off, cur, crossed = self.read_off, self.read_seq, False
+            while cur < seq:
+                rec = self._next(off, cur)
+                if rec is None:
+                    raise RuntimeError(f"Antrian rusak: record {cur} tidak ditemukan saat ack")
+                _, _, off, wrapped = rec
+                crossed = crossed or wrapped
+                cur += 1
+            self._maju(off, seq, crossed)
+            self._simpan_checkpoint()
+
+    def flush(self):
+        """Paksa isi mmap ke disk (tahan mati listrik, bukan hanya crash proses)."""
+        with self.lock:
+            self.mm.flush()
+
+    def close(self):
+        with self.lock:
+            self.mm.flush()
+            self.mm.close()
+            os.close(self.fd)   # melepas kunci
+
+
+def error_permanen(exc):
+    """
+    True jika backend menolak isi data (mengirim ulang tidak akan berhasil):
+    ValueError/TypeError dari SDK, atau FirebaseError dengan code INVALID_ARGUMENT
+    (mis. NaN, key berisi . # $ [ ]).
+    """
+    return isinstance(exc, (ValueError, TypeError)) or getattr(exc, 'code', None) == 'INVALID_ARGUMENT'
+
+
+class StoreForward:
+    """
+    Thread pengirim: ambil batch dari DiskQueue, kirim lewat `sink(items)`,
+    ack jika sukses, backoff eksponensial jika backend tidak bisa dihubungi.
+    Item yang ditolak permanen (lihat error_permanen) dipindah ke dead-letter.
+    """
+
+    def __init__(self, queue, sink, batch_size=500, idle_interval=1.0, max_backoff=60.0,
+                 is_permanent=error_permanen):
+        self.queue = queue
+        self.sink = sink
+        self.batch_size = batch_size
+        self.idle_interval = idle_interval
+        self.max_backoff = max_backoff
+        self.is_permanent = is_permanent
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.sent = 0
+        self.dead = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def _dead_letter(self, item, exc):
+        with open(self.queue.dead_path, 'a') as f:
+            f.write(json.dumps({'time': int(time.time() * 1000), 'error': str(exc), 'item': item}, default=str) + '\n')
+        self.dead += 1
+        print(f"☠️ Item ditolak backend dipindah ke {self.queue.dead_path}: {exc}")
+
+    def _kirim(self, items):
+        """Kirim items; jika ditolak permanen, belah dua sampai item penyebabnya ketemu."""
+        try:
+            self.sink(items)
+        except Exception as e:
+            if not self.is_permanent(e):
+                raise
+            if len(items) == 1:
+                self._dead_letter(items[0], e)
+                return
+            half = len(items) // 2
+            self._kirim(items[:half])
+            self._kirim(items[half:])
+
+    def kirim_sekali(self):
+        """Kirim satu batch. Return jumlah item diproses (exception jika error sementara)."""
+        items, token = self.queue.baca(self.batch_size)
+        if not items:
+            return 0
+        self._kirim(items)
+        self.queue.ack(token)
+        self.sent += len(items)
+        return len(items)
+
+    def _loop(self):
+        backoff = self.idle_interval
+        while not self.stop_event.is_set():
+            try:
+                if self.kirim_sekali() == 0:
+                    self.queue.flush()
+                    self.stop_event.wait(self.idle_interval)
+                backoff = self.idle_interval
+            except Exception as e:
+                print(f"⚠️ Gagal kirim ke backend ({e}). {len(self.queue)} item menunggu, coba lagi {backoff:.0f} detik.")
+                self.stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def stop(self, drain_timeout=10.0):
+        """Hentikan thread; coba kirim sisa antrian selama drain_timeout detik."""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+        deadline = time.time() + drain_timeout
+        try:
+            while len(self.queue) and time.time() < deadline:
+                self.kirim_sekali()
+        except Exception as e:
+            print(f"⚠️ Sisa {len(self.queue)} item tetap di antrian disk ({e}).")
+        self.queue.close()
+
+
+# ==========================================
+# HELPER FIREBASE
+# ==========================================
+PUSH_CHARS = '-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+_push_lock = threading.Lock()
+_last_push_time = 0
+_last_rand = [0] * 12
+
+def _kode_waktu(timestamp_ms):
+    """8 karakter awal push ID (timestamp ms, base64 urut)."""
+    time_chars = []
+    t = timestamp_ms
+    for _ in range(8):
+        time_chars.append(PUSH_CHARS[t % 64])
+        t //= 64
+    return ''.join(reversed(time_chars))
+
+def buat_push_id(timestamp_ms=None):
+    """
+    Key kronologis dengan format yang sama seperti ref.push() Firebase,
+    tapi dibuat lokal (tanpa round-trip) sehingga push bisa masuk antrian.
+    """
+    global _last_push_time
+    if timestamp_ms is None:
+        timestamp_ms = int(time.time() * 1000)
+    with _push_lock:
+        duplicate = timestamp_ms == _last_push_time
+        _last_push_time = timestamp_ms
+
+        push_id = _kode_waktu(timestamp_ms)
+
+        if not duplicate:
+            for i in range(12):
+                _last_rand[i] = random.randrange(64)
+        else:
+            # Timestamp sama -> naikkan angka acak agar tetap urut & unik
+            i = 11
+            while i >= 0 and _last_rand[i] == 63:
+                _last_rand[i] = 0
+                i -= 1
+            if i >= 0:
+                _last_rand[i] += 1
+
+        return push_id + ''.join(PUSH_CHARS[r] for r in _last_rand)
+
+def waktu_push_id(push_id):
+    """Kebalikan buat_push_id: timestamp (ms) dari 8 karakter pertama push ID."""
+    timestamp_ms = 0
+    for char in push_id[:8]:
+        timestamp_ms = timestamp_ms * 64 + PUSH_CHARS.index(char)
+    return timestamp_ms
+
+def batas_push_id(timestamp_ms):
+    """Push ID terkecil untuk timestamp_ms (batas bawah query order_by_key)."""
+    return _kode_waktu(timestamp_ms) + PUSH_CHARS[0] * 12
+
+def gabung_updates(items):
+    """
+    Gabungkan banyak multi-path update menjadi satu, berurutan (yang terakhir menang).
+    Firebase menolak path yang saling tumpang-tindih dalam satu update
+    (mis. 'sensor_now' dan 'sensor_now/suhu'), jadi keduanya dilebur di sini.
+    """
+    merged = {}
+    for updates in items:
+        for path, value in updates.items():
+            path = path.strip('/')
+            # Path baru menimpa semua turunannya
+            for existing in [p for p in merged if p.startswith(path + '/')]:
+                del merged[existing]
+            # Path baru adalah turunan path yang sudah ada -> tulis ke dalam nilainya
+            parent = next((p for p in merged if path.startswith(p + '/')), None)
+            if parent is None:
+                merged[path] = value
+                continue
+            node = merged[parent]
+            if not isinstance(node, dict):
+                node = merged[parent] = {}
+            keys = path[len(parent) + 1:].split('/')
+            for key in keys[:-1]:
+                if not isinstance(node.get(key), dict):
+                    node[key] = {}
+                node = node[key]
+            node[keys[-1]] = value
+    return merged
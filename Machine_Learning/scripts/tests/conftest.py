@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modul di scripts/ diimport langsung (sama seperti bridge_ml.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
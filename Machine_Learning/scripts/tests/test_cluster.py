@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("paho.mqtt.client")
+
+from cluster import ClusterConfig
+
+
+def test_mode_off_tanpa_instance_id():
+    config = ClusterConfig('off')
+    assert config.instance_id == 0 and config.is_leader
+
+
+@pytest.mark.parametrize('mode', ['partition', 'shared'])
+def test_mode_cluster_wajib_instance_id(mode, monkeypatch):
+    monkeypatch.setenv('CLUSTER_MODE', mode)
+    monkeypatch.setenv('CLUSTER_SIZE', '2')
+    monkeypatch.delenv('INSTANCE_ID', raising=False)
+    with pytest.raises(ValueError, match="INSTANCE_ID"):
+        ClusterConfig.from_env()
+    monkeypatch.setenv('INSTANCE_ID', '1')
+    config = ClusterConfig.from_env()
+    assert config.client_id == 'bridge_ml-1' and not config.is_leader
+
+
+def test_partition_instance_id_di_luar_rentang():
+    with pytest.raises(ValueError):
+        ClusterConfig('partition', 2, 2)
+    with pytest.raises(ValueError):
+        ClusterConfig('shared', -1)
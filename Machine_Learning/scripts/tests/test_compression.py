@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from compression import SeriesCompressor, rekonstruksi
+
+TOL = {'suhu': 0.5, 'ph': 0.05}
+
+
+def deret(n=3000, seed=11):
+    """Random walk + tren + noise, satu pembacaan tiap 5 detik."""
+    rng = random.Random(seed)
+    suhu, ph, records = 40.0, 7.0, []
+    for i in range(n):
+        suhu += rng.gauss(0.01, 0.15)
+        ph += rng.gauss(0, 0.01)
+        records.append({'timestamp': i * 5000, 'suhu': suhu, 'ph': ph,
+                        'fuzzy_label': 'BAIK' if suhu < 45 else 'CUKUP / SEDANG'})
+    return records
+
+
+@pytest.mark.parametrize('method', ['deadband', 'swinging_door'])
+def test_rekonstruksi_dalam_toleransi(method):
+    records = deret()
+    kompresor = SeriesCompressor(TOL, method=method, heartbeat=300)
+    stored = [p for r in records for p in kompresor.tambah('esp', r)] + kompresor.flush_semua()
+    assert len(stored) < len(records) / 3
+
+    timestamps = [r['timestamp'] for r in records]
+    hasil = rekonstruksi(stored, timestamps, fields=list(TOL), method=method)
+    for field, tol in TOL.items():
+        error = np.abs(hasil[field] - np.array([r[field] for r in records]))
+        assert error.max() <= tol + 1e-9, (method, field, error.max())
+
+
+def test_perubahan_label_disimpan():
+    records = deret()
+    kompresor = SeriesCompressor(TOL, method='swinging_door', heartbeat=10 ** 9)
+    stored = [p for r in records for p in kompresor.tambah('esp', r)] + kompresor.flush_semua()
+    for prev, cur in zip(records, records[1:]):
+        if prev['fuzzy_label'] != cur['fuzzy_label']:
+            assert any(p is prev for p in stored) and any(p is cur for p in stored)
@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from export_parquet import ParquetExporter, baca_kolom
+
+
+def test_device_id_tidak_keluar_dari_root(tmp_path):
+    root = tmp_path / 'export'
+    exporter = ParquetExporter(str(root))
+    for i, device_id in enumerate(['../../../x', 'esp/01', 'esp-01']):
+        exporter.tambah(f"k{i}", {'timestamp': 1714521600000, 'device_id': device_id, 'suhu': 40.0 + i})
+    exporter.flush()
+
+    assert not (tmp_path / 'x').exists()
+    for directory, _, files in os.walk(tmp_path):
+        for name in files:
+            assert os.path.realpath(directory).startswith(os.path.realpath(root))
+    assert sorted(os.listdir(root)) == ['device_id=..%2F..%2F..%2Fx', 'device_id=esp%2F01', 'device_id=esp-01']
+
+    # Nilai partisi di-decode kembali saat dibaca
+    table = baca_kolom(str(root), columns=['Temperature'], device_id='esp/01')
+    assert table.column('Temperature').to_pylist() == [41.0]
@@ -0,0 +1,42 @@
+import json
+import os
+import random
+
+from fault_detector import FaultDetector
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'kompos_config.json')
+
+
+def detektor():
+    with open(CONFIG_PATH, 'r') as f:
+        return FaultDetector.from_config(json.load(f)['fault_detection'])
+
+
+def test_default_mode_flag():
+    assert detektor().mode == 'flag'
+    assert FaultDetector().mode == 'flag'
+
+
+def test_firmware_bilangan_bulat_tidak_dianggap_stuck():
+    d = detektor()
+    faults = [d.periksa('esp', {'suhu': 48, 'moisture': 55, 'ph': 7}, i * 5000) for i in range(600)]
+    assert not any(faults)
+
+
+def test_ph_stuck_ditandai_lalu_belajar_ulang():
+    d = detektor()
+    rng = random.Random(3)
+    stuck_count = d.limits['ph']['stuck_count']
+    flagged = []
+    for i in range(100 + stuck_count + 50):
+        ph = round(7 + rng.gauss(0, 0.05), 2) if i < 100 else 6.83
+        if d.periksa('esp', {'ph': ph}, i * 5000) == ['ph:stuck']:
+            flagged.append(i)
+    # Ditandai setelah stuck_count pembacaan sama, lalu berhenti setelah relearn_after kali
+    assert len(flagged) == d.relearn_after - 1
+    assert flagged[0] >= 100 + stuck_count - 1
+
+
+def test_nilai_tidak_finite_range():
+    d = detektor()
+    assert d.periksa('esp', {'ph': float('nan')}, 0) == ['ph:range']
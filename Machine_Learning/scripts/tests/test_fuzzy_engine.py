@@ -0,0 +1,51 @@
+import json
+import os
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from fuzzy_engine import (defuzzifikasi, evaluasi_rules, hitung_membership, label_fuzzy,
+                          hitung_membership_batch, skor_fuzzy_batch)
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'kompos_config.json')
+
+# Titik patah fungsi keanggotaan ikut diuji (batas < / <= paling rawan beda)
+SUHU = [0, 20, 28, 30, 35, 45, 50, 55, 60, 80, 85]
+MOISTURE = [0, 30, 40, 46, 50, 52, 60, 100]
+PH = [0, 5, 6, 7, 8, 9, 14]
+AMMONIA = [0, 25, 27.5, 30, 50, 60]
+BAU = [0, 6, 7, 8, 10]
+
+
+@pytest.fixture(scope='module')
+def rules():
+    with open(CONFIG_PATH, 'r') as f:
+        return json.load(f)['rules']
+
+
+def data_uji(n_random=2000, seed=7):
+    rng = random.Random(seed)
+    rows = [(s, m, p, a, b) for s in SUHU for m in MOISTURE for p in PH for a in AMMONIA[::2] for b in BAU[::2]]
+    rows += [(rng.uniform(-5, 90), rng.uniform(0, 100), rng.uniform(0, 14), rng.uniform(0, 60), rng.uniform(0, 10))
+             for _ in range(n_random)]
+    return rows
+
+
+def test_membership_batch_sama_dengan_skalar():
+    rows = data_uji(200)
+    mu_batch = hitung_membership_batch(*(np.array(col, dtype=float) for col in zip(*rows)))
+    for i, row in enumerate(rows):
+        mu = hitung_membership(*row)
+        for name, value in mu.items():
+            assert mu_batch[name][i] == pytest.approx(value, abs=1e-9), (name, row)
+
+
+def test_skor_fuzzy_batch_sama_dengan_skalar(rules):
+    rows = data_uji()
+    scores, labels = skor_fuzzy_batch(*(np.array(col, dtype=float) for col in zip(*rows)), rules)
+    for i, row in enumerate(rows):
+        score = defuzzifikasi(evaluasi_rules(hitung_membership(*row), rules))
+        assert scores[i] == pytest.approx(score, abs=1e-9), row
+        assert labels[i] == label_fuzzy(score), row
@@ -0,0 +1,144 @@
+from rollup import ROLLUP_FLAG, RollupManager, bangun_ulang_rollup, gabung_ringkasan, statistik_deret
+
+TIERS = {'1h': 3600, '1d': 86400}
+DAY_MS = 86400 * 1000
+
+
+def isi(manager, device_id, n, start_ms, step_ms=60000, suhu=40.0):
+    updates = {}
+    for i in range(n):
+        updates.update(manager.tambah(device_id, {'suhu': suhu}, start_ms + i * step_ms))
+    return updates
+
+
+def test_restart_digabung_dengan_bucket_tersimpan():
+    stored = {}
+    lama = RollupManager(TIERS, partial_interval=0)
+    stored.update(isi(lama, 'esp', 600, 10 * DAY_MS))
+
+    # Proses baru (restart) di tengah hari yang sama
+    baru = RollupManager(TIERS, partial_interval=0, loader=stored.get)
+    updates = baru.tambah('esp', {'suhu': 50.0}, 10 * DAY_MS + 600 * 60000)
+    day = updates[f"1d/esp/{10 * DAY_MS}"]
+    assert day['n'] == 601
+    assert day['suhu']['max'] == 50.0 and day['suhu']['n'] == 601
+    # Tulis parsial berikutnya tidak menghitung ulang data tersimpan
+    updates = baru.tambah('esp', {'suhu': 50.0}, 10 * DAY_MS + 601 * 60000)
+    assert updates[f"1d/esp/{10 * DAY_MS}"]['n'] == 602
+
+
+def test_loader_gagal_bucket_ditahan():
+    stored = {f"1d/esp/{10 * DAY_MS}": {'t': 10 * DAY_MS, 'n': 5, 'suhu': {'min': 1, 'max': 2, 'mean': 1.5, 'n': 5}}}
+    offline = [True]
+
+    def loader(path):
+        if offline[0]:
+            raise ConnectionError('offline')
+        return stored.get(path)
+
+    manager = RollupManager(TIERS, partial_interval=0, loader=loader)
+    updates = isi(manager, 'esp', 3, 10 * DAY_MS + 3600 * 1000 * 23)
+    assert not updates   # tidak pernah menimpa bucket tersimpan tanpa digabung
+    # Bucket 1d selesai saat masih offline -> ditunda, lalu ditulis setelah online
+    updates = manager.tambah('esp', {'suhu': 40.0}, 11 * DAY_MS)
+    assert f"1d/esp/{10 * DAY_MS}" not in updates
+    assert updates[f"1d/esp/{11 * DAY_MS}"]['n'] == 1   # bucket baru setelah start tidak perlu digabung
+    offline[0] = False
+    updates = manager.tambah('esp', {'suhu': 40.0}, 11 * DAY_MS + 60000)
+    assert updates[f"1d/esp/{10 * DAY_MS}"]['n'] == 8
+    assert updates[f"1d/esp/{11 * DAY_MS}"]['n'] == 2
+
+
+def test_skor_window_tidak_menambah_jumlah_sampel():
+    manager = RollupManager(TIERS, partial_interval=float('inf'))
+    isi(manager, 'esp', 10, 0)
+    manager.tambah('esp', {'score': 80.0, 'ammonia': 1.0}, 10 * 60000, count=False)
+    day = manager.flush_semua()["1d/esp/0"]
+    assert day['n'] == 10
+    assert day['suhu']['n'] == 10 and day['score'] == {'min': 80.0, 'max': 80.0, 'mean': 80.0, 'n': 1}
+
+
+def test_gabung_ringkasan():
+    a = {'t': 0, 'n': 2, 'suhu': {'min': 1, 'max': 3, 'mean': 2, 'n': 2}}
+    b = {'t': 0, 'n': 1, 'suhu': {'min': 5, 'max': 5, 'mean': 5, 'n': 1}, 'ph': {'min': 7, 'max': 7, 'mean': 7, 'n': 1}}
+    out = gabung_ringkasan(a, b)
+    assert out['n'] == 3
+    assert out['suhu'] == {'min': 1, 'max': 5, 'mean': 3.0, 'n': 3}
+    assert out['ph']['n'] == 1
+
+
+class Ref:
+    """Cukup dari firebase_admin.db.Reference untuk bangun_ulang_rollup."""
+
+    def __init__(self, data, path=''):
+        self.data, self.path = data, path
+        self.order, self.lo, self.hi, self.limit = None, None, None, None
+
+    def child(self, path):
+        return Ref(self.data, f"{self.path}/{path}".strip('/'))
+
+    def order_by_child(self, name):
+        self.order = name
+        return self
+
+    def order_by_key(self):
+        return self
+
+    def start_at(self, value):
+        self.lo = value
+        return self
+
+    def end_at(self, value):
+        self.hi = value
+        return self
+
+    def limit_to_first(self, n):
+        self.limit = n
+        return self
+
+    def get(self):
+        prefix = self.path + '/' if self.path else ''
+        out = {}
+        for key, value in sorted(self.data.items()):
+            if key.startswith(prefix) and '/' not in key[len(prefix):]:
+                sort = value[self.order] if self.order else key[len(prefix):]
+                if (self.lo is None or sort >= self.lo) and (self.hi is None or sort <= self.hi):
+                    out[key[len(prefix):]] = value
+        return dict(list(out.items())[:self.limit]) if self.limit else out
+
+    def update(self, updates):
+        for path, value in updates.items():
+            device_path, field = path.rsplit('/', 1)
+            self.data[f"{self.path}/{device_path}"][field] = value
+
+
+def test_statistik_deret():
+    xs, ys = [0, 10, 20], [0.0, 10.0, 0.0]
+    assert statistik_deret(xs, ys, 0, 20) == (0.0, 10.0, 5.0)
+    assert statistik_deret(xs, ys, 5, 10) == (5.0, 5.0, 7.5)   # nilai di 10 milik bucket berikutnya
+    # deadband: nilai ditahan sampai titik berikutnya
+    assert statistik_deret(xs, ys, 0, 20, method='deadband') == (0.0, 10.0, 5.0)
+    assert statistik_deret(xs, ys, 20, 30, method='deadband') == (0.0, 0.0, 0.0)
+    assert statistik_deret(xs, ys, 30, 40) is None
+
+
+def test_bangun_ulang_rollup_dari_titik_terkompresi():
+    # Rollup menghitung 60 pembacaan per jam, sensor_logs hanya menyimpan 2 titik per jam
+    manager = RollupManager(TIERS, partial_interval=float('inf'))
+    updates = {}
+    for i in range(120):
+        updates.update(manager.tambah('esp', {'suhu': 40.0, 'score': 50.0}, i * 60000))
+    updates.update(manager.flush_semua())
+    rollups = {f"sensor_rollups/{path}": summary for path, summary in updates.items()}
+    logs = {f"sensor_logs/k{i}": {'timestamp': t, 'device_id': 'esp', 'score': score, ROLLUP_FLAG: True}
+            for i, (t, score) in enumerate([(0, 60.0), (3540000, 60.0), (3600000, 80.0), (7140000, 80.0)])}
+    data = {**rollups, **logs}
+
+    exact, approx, skipped = bangun_ulang_rollup(Ref(data, 'sensor_logs'), Ref(data, 'sensor_rollups'),
+                                                 0, DAY_MS, TIERS)
+    assert (exact, approx, skipped) == (0, 3, 0)
+    hour = data["sensor_rollups/1h/esp/0"]
+    # menit terakhir diinterpolasi menuju titik 80 di jam berikutnya
+    assert hour['score'] == {'min': 60.0, 'max': 60.0, 'mean': 60.167, 'n': 60}
+    assert hour['n'] == 60 and hour['suhu']['mean'] == 40.0   # field lain tidak disentuh
+    assert data["sensor_rollups/1d/esp/0"]['score']['max'] == 80.0
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from sensor_codec import (SMALL_BATCH, PayloadError, array_to_records, decode_array, decode_payload,
+                          decode_records, encode_readings)
+
+
+def pembacaan(n):
+    return [{'device_id': 1000 + i, 'timestamp': 1714521600 + i if i % 3 else 0,
+             'suhu': 32.1 + i * 0.37, 'moisture': 55.25 - i * 0.11, 'ph': 6.9 + (i % 7) * 0.05} for i in range(n)]
+
+
+@pytest.mark.parametrize('n', [1, SMALL_BATCH, SMALL_BATCH + 1, 100])
+def test_struct_dan_numpy_sama(n):
+    payload = encode_readings(pembacaan(n))
+    records = decode_payload(payload)
+    assert records == decode_records(payload) == array_to_records(decode_array(payload))
+    assert len(records) == n
+    assert records[1 % n]['device_id'] == str(1000 + 1 % n)
+
+
+def test_satu_record():
+    [record] = decode_payload(encode_readings([{'device_id': 7, 'timestamp': 1714521600,
+                                                'suhu': 32.1, 'moisture': 55.5, 'ph': 7.05}]))
+    assert record == {'device_id': '7', 'suhu': 32.1, 'moisture': 55.5, 'ph': 7.05, 'timestamp': 1714521600000}
+
+
+def test_json_tetap_didukung():
+    data = {'device_id': 'esp-01', 'suhu': 30}
+    assert decode_payload(json.dumps(data).encode('utf-8')) == [data]
+
+
+def test_panjang_salah_ditolak():
+    payload = encode_readings(pembacaan(2))
+    with pytest.raises(PayloadError):
+        decode_payload(payload[:-1])
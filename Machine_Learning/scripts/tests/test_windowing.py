@@ -0,0 +1,46 @@
+from windowing import WindowAggregator
+
+
+def test_window_penuh_ditutup_pesan_berikutnya():
+    windows = WindowAggregator(window_seconds=60)
+    for i in range(6):
+        assert windows.tambah('esp', {'suhu': 40.0 + i}, i * 10000) is None
+    avg = windows.tambah('esp', {'suhu': 46.0}, 60000)
+    assert avg['samples'] == 7 and avg['suhu'] == 43.0 and avg['window_start'] == 0
+
+
+def test_rata_rata_berjalan_dan_tutup_dini():
+    windows = WindowAggregator(window_seconds=60)
+    windows.tambah('esp', {'suhu': 40.0}, 0)
+    windows.tambah('esp', {'suhu': 42.0}, 5000)
+    assert windows.rata_rata('esp')['suhu'] == 41.0
+    avg = windows.tutup('esp', 5000)
+    assert avg['samples'] == 2 and avg['timestamp'] == 5000
+    assert windows.rata_rata('esp') is None
+
+
+def test_device_diam_ditutup_kadaluarsa():
+    windows = WindowAggregator(window_seconds=60)
+    windows.tambah('diam', {'suhu': 40.0}, 1000)
+    windows.tambah('diam', {'suhu': 44.0}, 2000)
+    opened = windows.windows['diam']['opened']
+    assert windows.tutup_kadaluarsa(grace_seconds=30, now=opened + 60) == {}
+    closed = windows.tutup_kadaluarsa(grace_seconds=30, now=opened + 90)
+    assert closed['diam']['suhu'] == 42.0 and closed['diam']['timestamp'] == 2000
+    assert not windows.windows
+
+
+def test_field_bertanda_fault_tidak_dirata_rata():
+    windows = WindowAggregator(window_seconds=60)
+    windows.tambah('esp', {'suhu': 40.0, 'ph': 7.0}, 0)
+    windows.tambah('esp', {'suhu': 85.0, 'ph': 7.2}, 10000, faults=['suhu:spike'])
+    avg = windows.tambah('esp', {'suhu': 42.0, 'ph': 7.4}, 60000)
+    assert avg['suhu'] == 41.0 and avg['ph'] == 7.2 and avg['samples'] == 3
+    assert avg['faults'] == ['suhu:spike']
+
+
+def test_field_rusak_sepanjang_window_tetap_diskor():
+    windows = WindowAggregator(window_seconds=60)
+    windows.tambah('esp', {'ph': 3.0}, 0, faults=['ph:stuck'])
+    avg = windows.tutup('esp', 0)
+    assert avg['ph'] == 3.0 and avg['faults'] == ['ph:stuck']
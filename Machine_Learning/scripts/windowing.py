@@ -0,0 +1,102 @@
+import threading
+import time
+
+# ==========================================
+# AGREGASI WINDOW PER DEVICE
+# ==========================================
+# Dipakai mode BRIDGE_MODE=window di bridge_ml.py: pembacaan mentah dirata-rata
+# per device selama WINDOW_SECONDS, lalu model + fuzzy dijalankan SEKALI per window
+# (sama seperti rata-rata 10 menit di Project.py, tapi per device dan ikut diskor).
+# Window ditutup oleh pesan berikutnya dari device; window device yang berhenti
+# mengirim ditutup oleh tutup_kadaluarsa() (dipanggil berkala oleh bridge).
+# Field yang ditandai FaultDetector ('suhu:spike', ...) tidak ikut dirata-rata selama
+# field itu masih punya sampel bersih di window; daftar fault ikut di hasil window.
+
+WINDOW_FIELDS = ['suhu', 'moisture', 'ph', 'bau']
+
+
+class WindowAggregator:
+    """
+    Jumlah & count per field per device. tambah() mengembalikan hasil rata-rata
+    ketika window device tersebut sudah penuh, selain itu None.
+    Nilai field bertanda fault dijumlah terpisah dan hanya dipakai jika field itu
+    tidak punya satu pun sampel bersih (seperti mode flag per pesan: tetap diskor, ditandai).
+    """
+
+    def __init__(self, window_seconds=600, fields=WINDOW_FIELDS):
+        self.window_seconds = window_seconds
+        self.window_ms = window_seconds * 1000
+        self.fields = list(fields)
+        # device_id -> {'start': ms, 'last': ms, 'opened': detik, 'count': n,
+        #               'sums': {field: [jumlah, n]}, 'flagged': {field: [jumlah, n]}, 'faults': set}
+        self.windows = {}
+        self.lock = threading.Lock()
+
+    def tambah(self, device_id, reading, timestamp_ms, faults=()):
+        """
+        Masukkan satu pembacaan. faults: hasil FaultDetector.periksa() untuk pembacaan ini.
+        Return hasil rata-rata jika window penuh, selain itu None.
+        """
+        flagged = {fault.split(':', 1)[0] for fault in faults}
+        with self.lock:
+            window = self.windows.get(device_id)
+            if window is None:
+                window = self.windows[device_id] = {'start': timestamp_ms, 'opened': time.time(), 'count': 0,
+                                                    'sums': {}, 'flagged': {}, 'faults': set()}
+
+            window['count'] += 1
+            window['last'] = timestamp_ms
+            window['faults'].update(faults)
+            for field in self.fields:
+                value = reading.get(field)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    total = window['flagged' if field in flagged else 'sums'].setdefault(field, [0.0, 0])
+                    total[0] += float(value)
+                    total[1] += 1
+
+            if timestamp_ms - window['start'] < self.window_ms:
+                return None
+
+            del self.windows[device_id]
+            return self._rata_rata(window, timestamp_ms)
+
+    def rata_rata(self, device_id):
+        """Rata-rata sementara window yang masih terbuka (None jika tidak ada)."""
+        with self.lock:
+            window = self.windows.get(device_id)
+            return self._rata_rata(window, window['last']) if window else None
+
+    def tutup(self, device_id, end_ms):
+        """Tutup window device saat itu juga (skor dini). Return hasil rata-rata atau None."""
+        with self.lock:
+            window = self.windows.pop(device_id, None)
+            return self._rata_rata(window, end_ms) if window else None
+
+    def tutup_kadaluarsa(self, grace_seconds=30, now=None):
+        """
+        Tutup window yang sudah terbuka lebih dari window_seconds + grace (jam bridge),
+        yaitu device yang berhenti mengirim. Return dict device_id -> hasil rata-rata.
+        """
+        now = time.time() if now is None else now
+        limit = self.window_seconds + grace_seconds
+        with self.lock:
+            expired = [device_id for device_id, window in self.windows.items() if now - window['opened'] >= limit]
+            return {device_id: self._rata_rata(window, window['last'])
+                    for device_id, window in ((d, self.windows.pop(d)) for d in expired)}
+
+    def _rata_rata(self, window, end_ms):
+        result = {field: total / n for field, (total, n) in window['flagged'].items()}
+        result.update({field: total / n for field, (total, n) in window['sums'].items()})
+        if window['faults']:
+            result['faults'] = sorted(window['faults'])
+        result['samples'] = window['count']
+        result['window_start'] = window['start']
+        result['timestamp'] = end_ms
+        return result
+
+    def flush_semua(self, now_ms):
+        """Tutup semua window yang masih terbuka. Return dict device_id -> hasil rata-rata."""
+        with self.lock:
+            results = {device_id: self._rata_rata(window, now_ms) for device_id, window in self.windows.items()}
+            self.windows.clear()
+            return results
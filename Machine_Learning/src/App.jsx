@@ -26,6 +26,14 @@ const firebaseConfig = {
   measurementId: "G-XYNFFN4VNP"
 };
 
+// Rentang grafik: 'live' dari sensor_logs, lainnya dari ringkasan sensor_rollups/<tier>/<device>
+const HISTORY_RANGES = {
+  live: { label: 'Live', tier: null, points: 30 },
+  '24h': { label: '24 Jam', tier: '10m', points: 144 },
+  '7d': { label: '7 Hari', tier: '1h', points: 168 },
+  '1y': { label: '1 Tahun', tier: '1d', points: 365 },
+};
+
 // ==========================================
 // 2. INITIALIZATION
 // ==========================================
@@ -43,11 +51,16 @@ try {
 // ==========================================
 export default function App() {
   // State
-  const [currentData, setCurrentData] = useState(null);
+  const [latestLog, setLatestLog] = useState(null);  // baris terakhir sensor_logs (bisa tertahan kompresi)
+  const [liveData, setLiveData] = useState(null);    // sensor_now: diupdate tiap pembacaan
   const [historyData, setHistoryData] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [isDark, setIsDark] = useState(true); // Default to Dark Mode for "Estetik"
+  const [historyRange, setHistoryRange] = useState('live');
+  const [rollupData, setRollupData] = useState([]);
+  const currentData = liveData || latestLog;
+  const deviceId = currentData?.device_id || 'default';
 
   // Toggle Theme
   const toggleTheme = () => setIsDark(!isDark);
@@ -91,10 +104,10 @@ export default function App() {
         }));
 
         setHistoryData([...finalData].reverse()); // Table: Newest first
-        setCurrentData(finalData[finalData.length - 1]); // Latest
+        setLatestLog(finalData[finalData.length - 1]); // Latest
         setError(null);
       } else {
-        setCurrentData(null);
+        setLatestLog(null);
         setHistoryData([]);
       }
       setLoading(false);
@@ -107,6 +120,48 @@ export default function App() {
     return () => unsubscribe();
   }, []);
 
+  // Effect: Nilai terkini dari sensor_now (sensor_logs hanya berisi titik hasil kompresi)
+  useEffect(() => {
+    if (!db) return;
+
+    const unsubscribe = onValue(ref(db, 'sensor_now'), (snapshot) => {
+      const item = snapshot.val();
+      setLiveData(item ? {
+        ...item,
+        timestamp: item.timestamp ? new Date(item.timestamp).toLocaleString('id-ID', { dateStyle: 'medium', timeStyle: 'medium' }) : "Just now",
+        ammonia: item.ammonia !== undefined ? item.ammonia : 0,
+        score: item.score !== undefined ? item.score : 0,
+        maturity: item.maturity || "Pending..."
+      } : null);
+    }, (err) => console.error("sensor_now Error:", err));
+
+    return () => unsubscribe();
+  }, []);
+
+  // Effect: Riwayat panjang dari rollup (rata-rata per bucket)
+  useEffect(() => {
+    const range = HISTORY_RANGES[historyRange];
+    if (!db || !range.tier) return;
+
+    const rollupQuery = query(ref(db, `sensor_rollups/${range.tier}/${deviceId}`), limitToLast(range.points));
+    const unsubscribe = onValue(rollupQuery, (snapshot) => {
+      const data = snapshot.val() || {};
+      const buckets = Object.values(data).sort((a, b) => a.t - b.t);
+      setRollupData(buckets.map(bucket => ({
+        id: String(bucket.t),
+        timestamp: new Date(bucket.t).toLocaleString('id-ID', { dateStyle: 'medium', timeStyle: 'short' }),
+        suhu: bucket.suhu?.mean,
+        moisture: bucket.moisture?.mean,
+        ph: bucket.ph?.mean,
+        ammonia: bucket.ammonia?.mean,
+        score: bucket.score?.mean,
+        samples: bucket.n
+      })));
+    }, (err) => console.error("Rollup Error:", err));
+
+    return () => unsubscribe();
+  }, [historyRange, deviceId]);
+
   // Loading State
   if (loading) {
     return (
@@ -193,7 +248,13 @@ export default function App() {
         <div className="grid grid-cols-1 lg:grid-cols-3 gap-8 mb-8">
           {/* Chart takes up 2/3 */}
           <div className="lg:col-span-2">
-            <ChartSection data={[...historyData].reverse()} isDark={isDark} />
+            <ChartSection
+              data={historyRange === 'live' ? [...historyData].reverse() : rollupData}
+              isDark={isDark}
+              ranges={HISTORY_RANGES}
+              range={historyRange}
+              onRangeChange={setHistoryRange}
+            />
           </div>
 
           {/* Score/Status Card takes up 1/3 */}
@@ -4,8 +4,8 @@ import { Activity } from 'lucide-react';
 import { motion } from 'framer-motion';
 import clsx from 'clsx';
 
-export default function ChartSection({ data, isDark }) {
-    if (!data || data.length === 0) return null;
+export default function ChartSection({ data, isDark, ranges, range = 'live', onRangeChange }) {
+    if (!data || (data.length === 0 && range === 'live')) return null;
 
     return (
         <motion.div
@@ -23,14 +23,35 @@ export default function ChartSection({ data, isDark }) {
                         <Activity className="text-emerald-500" size={24} />
                         Realtime Analytics
                     </h3>
-                    <p className={clsx("text-sm mt-1", isDark ? "text-slate-400" : "text-slate-500")}>Monitored Environmental Data</p>
-                </div>
-                <div className={clsx(
-                    "text-xs px-3 py-1 rounded-full border",
-                    isDark ? "bg-slate-800 border-slate-700 text-slate-400" : "bg-slate-100 border-slate-200 text-slate-500"
-                )}>
-                    Live Stream
+                    <p className={clsx("text-sm mt-1", isDark ? "text-slate-400" : "text-slate-500")}>
+                        {range === 'live' ? "Monitored Environmental Data" : "Average per interval"}
+                    </p>
                 </div>
+                {ranges ? (
+                    <div className="flex gap-1">
+                        {Object.entries(ranges).map(([key, option]) => (
+                            <button
+                                key={key}
+                                onClick={() => onRangeChange(key)}
+                                className={clsx(
+                                    "text-xs px-3 py-1 rounded-full border transition-all",
+                                    key === range
+                                        ? "bg-emerald-500 border-emerald-500 text-white"
+                                        : isDark ? "bg-slate-800 border-slate-700 text-slate-400" : "bg-slate-100 border-slate-200 text-slate-500"
+                                )}
+                            >
+                                {option.label}
+                            </button>
+                        ))}
+                    </div>
+                ) : (
+                    <div className={clsx(
+                        "text-xs px-3 py-1 rounded-full border",
+                        isDark ? "bg-slate-800 border-slate-700 text-slate-400" : "bg-slate-100 border-slate-200 text-slate-500"
+                    )}>
+                        Live Stream
+                    </div>
+                )}
             </div>
 
             <div className="h-[400px] w-full">
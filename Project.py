@@ -2,9 +2,15 @@ import firebase_admin
 from firebase_admin import credentials
 from firebase_admin import db
 import paho.mqtt.client as mqtt
-import json
+import os
+import sys
 import time
 
+# Decoder payload (JSON / biner) dipakai bersama dengan bridge_ml.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Machine_Learning", "scripts"))
+from sensor_codec import decode_payload
+from store_forward import DiskQueue, StoreForward, buat_push_id, gabung_updates
+
 # --- 1. SETUP FIREBASE ---
 # Pastikan nama file JSON sesuai dengan yang ada di folder laptopmu
 JSON_KEY_FILE = "komposproject-dfe5e-firebase-adminsdk-fbsvc-07b42ceab7.json"
@@ -25,6 +31,16 @@ ref_history = db.reference('sensor_logs')
 # Reference untuk Status Terkini (Angka Realtime)
 ref_current = db.reference('sensor_now')
 
+# Antrian disk store-and-forward: data tidak hilang saat koneksi ke Firebase putus
+antrian = DiskQueue(os.path.join("antrian", "project"))
+
+def kirim_ke_firebase(items):
+    updates = gabung_updates(items)
+    if updates:
+        db.reference().update(updates)
+
+pengirim = StoreForward(antrian, kirim_ke_firebase)
+
 # --- 2. KONFIGURASI MQTT ---
 MQTT_BROKER = "broker.hivemq.com"
 MQTT_PORT = 1883
@@ -49,12 +65,9 @@ def on_message(client, userdata, msg):
     global last_send_time, data_buffer
     
     try:
-        # 1. Terima payload
-        payload = msg.payload.decode("utf-8")
-        print(f"\n[MQTT] Terima Data: {payload}")
-        
-        # 2. Parsing JSON
-        data_json = json.loads(payload)
+        # 1 & 2. Terima payload dan parsing (JSON atau biner v1, bisa berisi beberapa pembacaan)
+        readings = decode_payload(msg.payload)
+        print(f"\n[MQTT] Terima Data: {readings}")
         
         # 3. Tambahkan data ke buffer
         current_time = time.time()
@@ -62,7 +75,7 @@ def on_message(client, userdata, msg):
             # Mulai jendela pertama saat data pertama masuk
             last_send_time = current_time
         
-        data_buffer.append(data_json)
+        data_buffer.extend(readings)
         time_since_window_start = current_time - last_send_time
         
         # 4. Kalau belum 10 menit, hanya kumpulkan data saja
@@ -97,11 +110,13 @@ def on_message(client, userdata, msg):
         avg_data['timestamp'] = int(time.time() * 1000)  # milidetik
         avg_data['samples'] = num_samples  # berapa banyak data dalam 10 menit
         
-        # 6. KIRIM KE FIREBASE (rata-rata 10 menit)
-        ref_history.push(avg_data)
-        ref_current.set(avg_data)
+        # 6. KIRIM KE FIREBASE (rata-rata 10 menit) lewat antrian disk
+        antrian.tambah({
+            f"sensor_logs/{buat_push_id(avg_data['timestamp'])}": avg_data,
+            "sensor_now": avg_data,
+        })
         
-        print(f"✅ [Firebase] Kirim RATA-RATA {num_samples} sampel untuk 10 menit terakhir!")
+        print(f"✅ [Firebase] Antrikan RATA-RATA {num_samples} sampel untuk 10 menit terakhir! ({len(antrian)} item di antrian)")
         
         # 7. Reset jendela 10 menit berikutnya
         data_buffer = []
@@ -125,9 +140,11 @@ if __name__ == "__main__":
     client.on_connect = on_connect
     client.on_message = on_message
     
+    pengirim.start()
     client.connect(MQTT_BROKER, MQTT_PORT, 60)
     
     try:
         client.loop_forever()
     except KeyboardInterrupt:
-        print("\nProgram dihentikan.")
\ No newline at end of file
+        pengirim.stop()
+        print(f"\nProgram dihentikan. {len(antrian)} item tersimpan di antrian disk.")
\ No newline at end of file